@@ -0,0 +1,88 @@
+"""
+Сравнение прежнего LandingPageParser.preprocess_text с parsers.text.normalize_text.
+
+Вход — тексты из parsed_results.csv, склеенные в один документ и размноженные
+до нужного размера (по умолчанию ×3, около 6 млн символов).
+
+    python benchmarks/bench_preprocess_text.py [--repeat 3] [--runs 5] [--max-chars 9000]
+"""
+import os
+import re
+import sys
+import csv
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers.text import normalize_text
+
+
+def legacy_preprocess_text(raw_text: str) -> str:
+    """Реализация preprocess_text до выделения parsers.text — эталон для сравнения."""
+    text = raw_text.replace('\xa0', '. ')
+    text = text.replace('\n', '. ')
+    text = re.sub(r'\s+', ' ', text)
+
+    phone_regex = r'(\+7\s*\(?\d{3}\)?[\s-]*\d{3}[\s-]*\d{2}[\s-]*\d{2}|8\s*\(?\d{3}\)?[\s-]*\d{3}[\s-]*\d{2}[\s-]*\d{2})'
+    text = re.sub(phone_regex, '', text)
+    link_regex = r'http[s]?://\S+|www\S+'
+    text = re.sub(link_regex, '', text)
+
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    seen = set()
+    filtered_sentences = []
+    for s in sentences:
+        s_clean = s.strip()
+        if len(s_clean) < 10:
+            continue
+        if s_clean.lower() not in seen:
+            seen.add(s_clean.lower())
+            filtered_sentences.append(s_clean)
+
+    processed_text = ' '.join(filtered_sentences).lower()
+    processed_text = re.sub(r'\b\d+(?:[.,]\d+)?\b', '', processed_text)
+    return processed_text
+
+
+def load_corpus(path: str, repeat: int) -> str:
+    csv.field_size_limit(sys.maxsize)
+    with open(path, encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    fields = ('title', 'description', 'last_posts')
+    text = '\n'.join(row.get(k) or '' for row in rows for k in fields)
+    return text * repeat
+
+
+def best_of(func, text: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--csv', default=os.path.join(root, 'parsed_results.csv'))
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--max-chars', type=int, default=9000)
+    args = ap.parse_args()
+
+    text = load_corpus(args.csv, args.repeat)
+    assert normalize_text(text) == legacy_preprocess_text(text), 'compat-режим разошёлся с эталоном'
+
+    legacy = best_of(legacy_preprocess_text, text, args.runs)
+    compat = best_of(normalize_text, text, args.runs)
+    capped = best_of(lambda t: normalize_text(t, max_chars=args.max_chars), text, args.runs)
+    print(f'вход: {len(text):,} символов, лучшее из {args.runs} запусков')
+    print(f'legacy preprocess_text        : {legacy * 1000:8.1f} ms')
+    print(f'normalize_text                : {compat * 1000:8.1f} ms  ×{legacy / compat:.2f}')
+    print(f'normalize_text(max_chars={args.max_chars}): {capped * 1000:8.1f} ms  ×{legacy / capped:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from parsers.store import Shared
+
+# Замены идут от безопасных к заметным: сначала то, что не меняет текст
+# по смыслу, затем сокращения, затем удаление слов и, в конце, целых предложений.
+
+_COMPACT_RULES: Sequence[Tuple[Pattern, str]] = (
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\s+([,.!?:;…%)»])"), r"\1"),
+    (re.compile(r"([(«])\s+"), r"\1"),
+    (re.compile(r"\.{3}"), "…"),
+    (re.compile(r"([!?])\1+"), r"\1"),
+    (re.compile(r",{2,}"), ","),
+)
+
+# Длинные обороты → короткие, без потери смысла.
+_PHRASE_RULES: Sequence[Tuple[Pattern, str]] = tuple(
+    (re.compile(rf"\b{phrase}\b", re.IGNORECASE), short) for phrase, short in (
+        (r"(?:,\s*)?\bа также", " и"),
+        (r"для того,? чтобы", "чтобы"),
+        (r"в случае,? если", "если"),
+        (r"в настоящее время", "сейчас"),
+        (r"на сегодняшний день", "сегодня"),
+        (r"более чем", "более"),
+    )
+)
+
+# Сокращения: единицы после числа и устойчивые выражения.
+_ABBREVIATION_RULES: Sequence[Tuple[Pattern, str]] = (
+    (re.compile(r"(?<=\d)\s*(?:процентов|процента|процент)\b", re.IGNORECASE), "%"),
+    (re.compile(r"(?<=\d)\s*(?:тысяч|тысячи|тысяча)\b", re.IGNORECASE), " тыс."),
+    (re.compile(r"(?<=\d)\s*(?:миллионов|миллиона|миллион)\b", re.IGNORECASE), " млн"),
+    (re.compile(r"(?<=\d)\s*(?:миллиардов|миллиарда|миллиард)\b", re.IGNORECASE), " млрд"),
+    (re.compile(r"(?:(?<=\d)|(?<=тыс\.)|(?<=млн)|(?<=млрд))\s*(?:рублей|рубля|рубль)\b", re.IGNORECASE), " ₽"),
+    (re.compile(r"(?<=\d)\s*(?:минут|минуты|минута)\b", re.IGNORECASE), " мин"),
+    (re.compile(r"(?<=\d)\s*(?:часов|часа|час)\b", re.IGNORECASE), " ч"),
+    (re.compile(r"(?<=\d)\s*(?:километров|километра|километр)\b", re.IGNORECASE), " км"),
+    (re.compile(r"(?<=\d)\s*квадратных метров\b", re.IGNORECASE), " м²"),
+    (re.compile(r"\bи так далее\b", re.IGNORECASE), "и т. д."),
+    (re.compile(r"\bв том числе\b", re.IGNORECASE), "в т. ч."),
+    (re.compile(r"\bСанкт-Петербург\w*"), "СПб"),
+)
+
+# Слова-усилители, без которых фраза остаётся грамматичной.
+FILLER_WORDS = (
+    "очень", "действительно", "буквально", "абсолютно", "совершенно", "невероятно",
+    "по-настоящему", "по-прежнему", "на самом деле", "без сомнения", "конечно", "всего лишь",
+)
+_FILLER = r"\b(?:" + "|".join(re.escape(word) for word in FILLER_WORDS) + r")\b,?\s*"
+_FILLER_RE = re.compile(_FILLER, re.IGNORECASE)
+_LEADING_FILLER_RE = re.compile(rf"(^|[.!?…]\s+)(?:{_FILLER})+(\w)", re.IGNORECASE)
+_SENTENCE_RE = re.compile(r"[^.!?…]+(?:[.!?…]+|$)")
+
+
+def compact(text: str) -> str:
+    """Лишние пробелы, пробелы перед знаками, повторные «!!» и «...»."""
+    for pattern, repl in _COMPACT_RULES:
+        text = pattern.sub(repl, text)
+    return text.strip(" ,;")
+
+
+def _keep_case(match: "re.Match", repl: str) -> str:
+    word = repl.lstrip()
+    if match.group().lstrip(", ")[:1].isupper():
+        return repl[:len(repl) - len(word)] + word.capitalize()
+    return repl
+
+
+def shorten_phrases(text: str) -> str:
+    for pattern, repl in _PHRASE_RULES:
+        text = pattern.sub(lambda m: _keep_case(m, repl), text)
+    return compact(text)
+
+
+def abbreviate(text: str) -> str:
+    for pattern, repl in _ABBREVIATION_RULES:
+        text = pattern.sub(repl, text)
+    return compact(text)
+
+
+def drop_fillers(text: str) -> str:
+    # усилитель в начале предложения: следующее слово становится с заглавной
+    text = _LEADING_FILLER_RE.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+    return compact(_FILLER_RE.sub("", text))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.findall(text) if s.strip()]
+
+
+def trim_sentences(text: str, limit: int) -> str:
+    """Отбрасывает предложения с конца, пока текст не уложится в limit. Первое предложение остаётся всегда."""
+    sentences = split_sentences(text)
+    while len(sentences) > 1 and len(" ".join(sentences)) > limit:
+        sentences.pop()
+    return " ".join(sentences)
+
+
+_STEPS: Sequence[Callable[[str], str]] = (compact, shorten_phrases, abbreviate, drop_fillers)
+
+
+class LocalFixer:
+    """
+    Исправляет превышение длины креатива без запроса к LLM.
+
+    Шаги применяются по очереди, пока текст не уложится в лимит:
+    сжатие пробелов и пунктуации → короткие обороты → сокращения →
+    удаление слов-усилителей → отбрасывание последних предложений.
+    Слова посередине не обрезаются: если ни один шаг не помог, исправление
+    остаётся за LLM. Итог проверяется тем же валидатором, что и ответ модели.
+
+    Счётчики attempts / fixed показывают, какую долю исправлений взял на себя фиксер.
+    """
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.fixed = 0
+        self._lock = threading.Lock()
+
+    def fit(self, text: str, limit: int) -> Optional[str]:
+        """:return: Текст не длиннее limit или None, если уложиться без LLM не вышло."""
+        for step in _STEPS:
+            text = step(text)
+            if len(text) <= limit:
+                return text
+        text = trim_sentences(text, limit)
+        return text if len(text) <= limit else None
+
+    def fix(
+        self,
+        headline: str,
+        ad_text: str,
+        max_headline: int,
+        max_ad_text: int,
+        validate: Callable[[str, str], List[str]]
+    ) -> Optional[Dict[str, str]]:
+        """
+        Считаются только креативы, где ошибки — одно превышение длины: валидатор
+        даёт по ошибке на каждое слишком длинное поле, остальное (например, «ты»)
+        фиксер не исправляет, и такие креативы сразу уходят в LLM.
+
+        :param validate: Валидатор креатива (CreativeGenerator._validate).
+        :return: Исправленный креатив или None, если нужна LLM.
+        """
+        too_long = (len(headline) > max_headline) + (len(ad_text) > max_ad_text)
+        if not too_long or len(validate(headline, ad_text)) > too_long:
+            return None
+        fixed: Optional[Dict[str, str]] = None
+        new_headline = headline if len(headline) <= max_headline else self.fit(headline, max_headline)
+        new_ad_text = ad_text if len(ad_text) <= max_ad_text else self.fit(ad_text, max_ad_text)
+        if new_headline is not None and new_ad_text is not None and not validate(new_headline, new_ad_text):
+            fixed = {"headline": new_headline, "ad_text": new_ad_text}
+        with self._lock:
+            self.attempts += 1
+            self.fixed += fixed is not None
+        return fixed
+
+    def stats(self) -> Dict[str, float]:
+        """attempts, fixed и fixed_rate — доля исправлений без обращения к LLM."""
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "fixed": self.fixed,
+                "fixed_rate": self.fixed / self.attempts if self.attempts else 0.0,
+            }
+
+
+_fixer: Shared[LocalFixer] = Shared(LocalFixer)
+
+
+def get_local_fixer() -> LocalFixer:
+    """Возвращает общий для процесса LocalFixer (счётчики копятся по всем генераторам)."""
+    return _fixer.get()
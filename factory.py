@@ -1,48 +1,172 @@
 import re
+import asyncio
+import logging
+import traceback
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 
+from parsers.aio import get_async_fetcher, close_async_fetcher
+from parsers.backends import get_html_backend
+from parsers.download import decode_body
+from parsers.canonical import acanonical_url, canonical_url, group_by_canonical
 from parsers.base import LandingPageParser
+from parsers.session import get_session_pool
+from parsers.retry import CONNECT_TIMEOUT, CircuitOpenError, get_retry_policy
+from parsers.throttle import BACKOFF_STATUSES, round_robin_order
+from parsers.tg_cache import CHANNEL, BOT, DEAD, get_handle_cache, normalize_handle
 from parsers.tg_channel import TelegramWebParser, TelegramPostParser
 from parsers.tg_bot import TelegramBotWebParser
 
+logger = logging.getLogger(__name__)
+
+TELEGRAM_HOSTS = ("t.me", "telegram.me")
+PROBE_TIMEOUT = 5
+
+
+def _channel_probe_urls(url: str) -> Tuple[str, List[str]]:
+    parsed = urlparse(url)
+    name = parsed.path.lstrip("/")
+    # если уже /s/… — проверяем сразу это:
+    if name.startswith("s/"):
+        return name, [url]
+    # сначала пробуем /s/{name}, потом сам {name}
+    return name, [f"{parsed.scheme}://{parsed.netloc}/s/{name}", url]
+
+
+def _is_channel_page(tree: Any, name: str) -> bool:
+    backend = get_html_backend()
+    # 1) канал в режиме /s/:
+    if backend.select_one(tree, ".tgme_channel_info_header"):
+        return True
+    # 2) «чистый» канал-preview:
+    if backend.select_one(tree, f'.tgme_page_context_link[href^="/s/{name}"]'):
+        return True
+    return False
+
+
+def _probe_get(url: str) -> requests.Response:
+    resp = get_session_pool().get(url, timeout=(CONNECT_TIMEOUT, PROBE_TIMEOUT))
+    if resp.status_code in BACKOFF_STATUSES:
+        # 429/5xx — повод для повтора, а не признак мёртвого хэндла
+        resp.raise_for_status()
+    return resp
+
+
+def _probe_telegram(url: str) -> Tuple[Optional[str], Dict[str, Tuple[str, Any]]]:
+    """
+    Определяет тип ссылки и возвращает загруженные при проверке страницы
+    {url: (html, tree)}, чтобы парсер не скачивал и не разбирал их повторно.
+
+    Тип: CHANNEL, BOT, DEAD (t.me ответил ошибкой на все пробы)
+    или None (пробы не дошли из-за сетевых ошибок — результат не кэшируется).
+    Временные ошибки повторяются по общей политике (parsers.retry).
+    """
+    pages: Dict[str, Tuple[str, Any]] = {}
+    answered = False
+    name, test_urls = _channel_probe_urls(url)
+    for u in test_urls:
+        try:
+            resp = get_retry_policy().call(u, lambda: _probe_get(u))
+        except (requests.RequestException, CircuitOpenError) as e:
+            logger.warning(f"Проба {u} не удалась: {e}")
+            continue
+        answered = True
+        if resp.status_code != 200:
+            continue
+        # не resp.text: без charset в заголовке requests угадывает кодировку по всему телу
+        html = decode_body(resp.content, resp.headers.get("Content-Type"))
+        tree = get_html_backend().parse(html)
+        pages[u] = (html, tree)
+        if _is_channel_page(tree, name):
+            return CHANNEL, pages
+
+    return _probe_result(pages, answered), pages
+
+
+async def _aprobe_telegram(url: str) -> Tuple[Optional[str], Dict[str, Tuple[str, Any]]]:
+    """Асинхронный аналог _probe_telegram."""
+    pages: Dict[str, Tuple[str, Any]] = {}
+    answered = False
+    name, test_urls = _channel_probe_urls(url)
+    fetcher = get_async_fetcher()
+    for u in test_urls:
+        try:
+            html = await get_retry_policy().acall(u, lambda: fetcher.fetch(u, timeout=PROBE_TIMEOUT, connect_timeout=CONNECT_TIMEOUT))
+        except aiohttp.ClientResponseError as e:
+            # 4xx — ответ t.me о хэндле; 429/5xx после повторов — t.me просто не ответил
+            answered = answered or e.status not in BACKOFF_STATUSES
+            continue
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError) as e:
+            logger.warning(f"Проба {u} не удалась: {e}")
+            continue
+        answered = True
+        tree = get_html_backend().parse(html)
+        pages[u] = (html, tree)
+        if _is_channel_page(tree, name):
+            return CHANNEL, pages
+
+    return _probe_result(pages, answered), pages
+
+
+def _probe_result(pages: Dict[str, Tuple[str, Any]], answered: bool) -> Optional[str]:
+    if pages:
+        return BOT
+    return DEAD if answered else None
+
+
 def is_telegram_channel(url: str) -> bool:
     """
     Определяет, ведёт ли ссылка на t.me/{name} на канал (а не на бота).
     Работает и для ссылок вида /s/, и для "чистых" t.me/{name}.
     """
-    parsed = urlparse(url)
-    if parsed.netloc.lower() not in ("t.me", "telegram.me"):
+    if urlparse(url).netloc.lower() not in TELEGRAM_HOSTS:
         return False
+    return _probe_telegram(url)[0] == CHANNEL
 
-    name = parsed.path.lstrip("/")
-    # если уже /s/… — проверяем сразу это:
-    if name.startswith("s/"):
-        test_urls = [url]
+
+async def ais_telegram_channel(url: str) -> bool:
+    """Асинхронный аналог is_telegram_channel."""
+    if urlparse(url).netloc.lower() not in TELEGRAM_HOSTS:
+        return False
+    return (await _aprobe_telegram(url))[0] == CHANNEL
+
+
+def _is_telegram_post(path: str) -> bool:
+    return re.match(r"^(?:s/)?[^/]+/\d+$", path) is not None
+
+
+def _telegram_parser(url: str, kind: Optional[str], pages: Dict[str, Tuple[str, Any]]):
+    parsed = urlparse(url)
+    path = parsed.path.lstrip("/")
+    if kind == CHANNEL:
+        if not path.startswith("s/"):
+            name = path
+            url = f"{parsed.scheme}://{parsed.netloc}/s/{name}"
+        cls = TelegramWebParser
     else:
-        # сначала пробуем /s/{name}, потом сам {name}
-        test_urls = [
-            f"{parsed.scheme}://{parsed.netloc}/s/{name}",
-            url
-        ]
+        cls = TelegramBotWebParser
 
-    for u in test_urls:
-        try:
-            resp = requests.get(u, timeout=5)
-            if resp.status_code != 200:
-                continue
-            soup = BeautifulSoup(resp.text, "html.parser")
-            # 1) канал в режиме /s/:
-            if soup.select_one(".tgme_channel_info_header"):
-                return True
-            # 2) «чистый» канал-preview:
-            if soup.select_one(f'.tgme_page_context_link[href^="/s/{name}"]'):
-                return True
-        except requests.RequestException:
-            continue
+    if kind == DEAD:
+        # пустой html: парсер сразу вернёт ошибку загрузки без запроса
+        return cls(url, html="")
+
+    # страница, скачанная при проверке, отдаётся парсеру вместе с готовым деревом
+    html, tree = pages.get(url, (None, None))
+    return cls(url, html=html, tree=tree)
+
+
+def _cached_kind(url: str) -> Optional[str]:
+    return get_handle_cache().get(normalize_handle(url))
+
+
+def _remember_kind(url: str, kind: Optional[str]) -> None:
+    if kind is not None:
+        get_handle_cache().set(normalize_handle(url), kind)
 
-    return False
 
 def get_parser(url: str):
     """
@@ -50,21 +174,93 @@ def get_parser(url: str):
       - настоящий канал Telegram → TelegramWebParser
       - бот Telegram               → TelegramBotWebParser
       - всё прочее                 → LandingPageParser
+
+    Тип t.me-хэндла берётся из постоянного кэша (parsers.tg_cache),
+    пробные запросы выполняются только для новых или устаревших хэндлов.
+    Перед выбором парсера URL приводится к каноническому виду: короткие ссылки
+    раскрываются, трекинговые параметры убираются (parsers.canonical).
     """
+    url = canonical_url(url)
     parsed = urlparse(url)
-    netloc = parsed.netloc.lower()
-    if netloc not in ("t.me", "telegram.me"):
+    if parsed.netloc.lower() not in TELEGRAM_HOSTS:
         return LandingPageParser(url)
 
-    path = parsed.path.lstrip("/")
-    
-    if re.match(r"^(?:s/)?[^/]+/\d+$", path):
+    if _is_telegram_post(parsed.path.lstrip("/")):
         return TelegramPostParser(url)
-    
-    if is_telegram_channel(url):
-        if not path.startswith("s/"):
-            name = path
-            url = f"{parsed.scheme}://{parsed.netloc}/s/{name}"
-        return TelegramWebParser(url)
 
-    return TelegramBotWebParser(url)
+    kind = _cached_kind(url)
+    if kind is not None:
+        return _telegram_parser(url, kind, {})
+
+    kind, pages = _probe_telegram(url)
+    _remember_kind(url, kind)
+    return _telegram_parser(url, kind, pages)
+
+
+async def aget_parser(url: str):
+    """
+    Асинхронный аналог get_parser: проба канал/бот не блокирует event loop,
+    чтение и запись кэша хэндлов (SQLite) идут в отдельном потоке.
+    """
+    url = await acanonical_url(url)
+    parsed = urlparse(url)
+    if parsed.netloc.lower() not in TELEGRAM_HOSTS:
+        return LandingPageParser(url)
+
+    if _is_telegram_post(parsed.path.lstrip("/")):
+        return TelegramPostParser(url)
+
+    kind = await asyncio.to_thread(_cached_kind, url)
+    if kind is not None:
+        return _telegram_parser(url, kind, {})
+
+    kind, pages = await _aprobe_telegram(url)
+    await asyncio.to_thread(_remember_kind, url, kind)
+    return _telegram_parser(url, kind, pages)
+
+
+async def aparse_url(url: str) -> Dict[str, Any]:
+    """
+    Парсит один URL асинхронно. Исключения не пробрасываются:
+    в результат пишутся url, parsed_at (UTC) и error (стектрейс, ошибка парсера или None).
+    """
+    try:
+        parser = await aget_parser(url)
+        data = await parser.aparse() or {}
+        error = None
+    except Exception:
+        data = {}
+        error = traceback.format_exc()
+    data.setdefault("url", url)
+    data["parsed_at"] = datetime.utcnow()
+    # ошибка загрузки из самого парсера не затирается
+    data["error"] = error or data.get("error")
+    return data
+
+
+async def aparse_urls(urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    Парсит список URL конкурентно. Число одновременных запросов ограничивает
+    AsyncFetcher (см. parsers.aio.configure_async_fetcher), частоту запросов
+    к каждому хосту — HostThrottle. Задачи запускаются с чередованием хостов.
+
+    Ссылки сначала приводятся к каноническому виду: каждая страница парсится
+    один раз, а результат копируется во все строки с тем же canonical_url.
+
+    :return: Результаты в порядке входного списка; url в каждом — исходный адрес строки.
+    """
+    try:
+        unique = list(dict.fromkeys(urls))
+        resolved = dict(zip(unique, await asyncio.gather(*(acanonical_url(u) for u in unique))))
+        groups = group_by_canonical([resolved[u] for u in urls])
+        pages = list(groups)
+        order = round_robin_order(pages)
+        parsed = await asyncio.gather(*(aparse_url(pages[i]) for i in order))
+
+        results: List[Dict[str, Any]] = [{} for _ in urls]
+        for i, data in zip(order, parsed):
+            for row in groups[pages[i]]:
+                results[row] = dict(data, url=urls[row], canonical_url=pages[i])
+        return results
+    finally:
+        await close_async_fetcher()
@@ -0,0 +1,86 @@
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JSONObjectStream:
+    """
+    Инкрементальный разбор JSON-объекта верхнего уровня из потока токенов.
+
+    feed() принимает очередной кусок текста и возвращает пары (ключ, значение)
+    для каждого поля-объекта верхнего уровня, как только его «}» пришла:
+    из {"Стиль 1": {...}, "Стиль 2": {...}} первый стиль доступен, пока
+    второй ещё генерируется. Текст до первой «{» (```json, пояснения) пропускается,
+    поля со скалярными значениями игнорируются.
+    """
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_chars: Optional[List[str]] = None
+        self._key: Optional[str] = None
+        self._value: List[str] = []
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        closed: List[Tuple[str, Any]] = []
+        for ch in chunk:
+            if self.done:
+                break
+            if self._depth >= 2:
+                self._value.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        self._key = json.loads('"' + "".join(self._key_chars) + '"')
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_chars = []
+                    self._expect_key = False
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._depth == 2:
+                    self._value = [ch]
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 1 and self._key is not None:
+                    closed.append(self._close())
+                elif self._depth == 0:
+                    self.done = True
+            elif ch == "[" and self._depth >= 1:
+                self._depth += 1
+                if self._depth == 2:
+                    self._value = [ch]
+            elif ch == "]" and self._depth >= 2:
+                self._depth -= 1
+                if self._depth == 1:
+                    self._value = []
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._key = None
+        return closed
+
+    def _close(self) -> Tuple[str, Any]:
+        key, raw = self._key, "".join(self._value)
+        self._key, self._value = None, []
+        try:
+            return key, json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error in field {key!r}: {e}\nRaw content: {raw}")
+            return key, None
@@ -1,14 +1,15 @@
 import re
 import json
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
 from pydantic import BaseModel, ValidationError
 
-# from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
-# from mistral_common.protocol.instruct.messages import SystemMessage, UserMessage
-# from mistral_common.protocol.instruct.request import ChatCompletionRequest
+from parsers.density import compact_page
+from llm_cache import cached_completion
+from llm_limiter import COMPLETION_TOKENS, limited_call
+from prompt_packer import get_token_counter, pack_page
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -34,33 +35,35 @@ def timeout_handler(signum, frame):
 class LLMAsJudge:
     MAX_RETRIES = 3
     RETRY_DELAY = 1
+    # бюджет токенов на контент страницы в user-сообщении
+    CONTENT_TOKEN_BUDGET = 2500
     
-    def __init__(self, client: Any, model: str, url: str, max_retries: int = 3) -> None:
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        url: str,
+        max_retries: int = 3,
+        content_token_budget: Optional[int] = None,
+        cache_sampled: bool = False
+    ) -> None:
         """
         :param client: Экземпляр клиента для доступа к API Mistral.
         :param model: Имя используемой модели (например, 'mistral-large-latest').
+        :param content_token_budget: Бюджет токенов на контент страницы (см. prompt_packer).
+        :param cache_sampled: Кэшировать и ответы с temperature > 0 (см. llm_cache).
         """
         self.client = client
         self.model = model
         self.url = url
         self.max_retries = max_retries or self.MAX_RETRIES
+        self.content_token_budget = content_token_budget or self.CONTENT_TOKEN_BUDGET
+        self.token_counter = get_token_counter()
+        self.cache_sampled = cache_sampled
         
-        # self.tokenizer = MistralTokenizer.v3() 
-        
-    # def _count_messages_tokens(self, system_prompt: str, user_message: str) -> int:
-    #     """
-    #     Считает токены сразу по всей паре сообщений (system + user).
-    #     Возвращает len(tokens) из encode_chat_completion.
-    #     """
-    #     req = ChatCompletionRequest(
-    #         model=self.model,
-    #         messages=[
-    #             SystemMessage(content=system_prompt),
-    #             UserMessage(content=user_message),
-    #         ],
-    #     )
-    #     tokenized = self.tokenizer.encode_chat_completion(req)
-    #     return len(tokenized.tokens)
+    def _count_messages_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Считает токены всех сообщений запроса локальным токенизатором или оценкой."""
+        return self.token_counter.count_messages(messages)
     
     def _is_telegram(self) -> bool:
         return "t.me" in urlparse(self.url).netloc
@@ -71,28 +74,47 @@ class LLMAsJudge:
             raise JSONParseError("JSON block not found in response")
         return match.group(0)
     
+    def _parse_aspects(self, text: str) -> KeyAspectsModel:
+        """:raises JSONParseError, ValueError, ValidationError: если в ответе нет JSON по схеме KeyAspectsModel."""
+        return KeyAspectsModel.parse_raw(self._extract_json(text))
+
+    def _is_valid(self, text: str) -> bool:
+        try:
+            self._parse_aspects(text)
+        except (JSONParseError, json.JSONDecodeError, ValidationError, ValueError):
+            return False
+        return True
+
     def _api_call(self, messages: List[Dict[str, str]], temperature: float, top_p: float) -> str:
-        retries = 0
-        while True:
-            try:
-                resp = self.client.chat.complete(
+        """
+        Запрос к API через кэш ответов (llm_cache): при temperature=0 повторы не оплачиваются.
+        В кэш попадают только ответы, прошедшие валидацию KeyAspectsModel.
+        """
+        return cached_completion(
+            self.model, messages, temperature, top_p,
+            lambda: self._complete(messages, temperature, top_p),
+            cache_sampled=self.cache_sampled,
+            validate=self._is_valid
+        )
+
+    def _complete(self, messages: List[Dict[str, str]], temperature: float, top_p: float) -> str:
+        """Запрос к API через общий лимитер (llm_limiter): 429 и Retry-After учитываются всеми воркерами."""
+        try:
+            resp = limited_call(
+                lambda: self.client.chat.complete(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
                     top_p=top_p,
                     stream=False
-                )
-                return resp.choices[0].message.content
-            except Exception as e:
-                err = str(e)
-                if '429' in err and retries < self.max_retries:
-                    wait = self.RETRY_DELAY * (2 ** retries)
-                    logger.warning(f"Получен 429, повтор через {wait}s (попытка {retries+1})...")
-                    time.sleep(wait)
-                    retries += 1
-                    continue
-                logger.error(f"API call failed: {e}")
-                raise
+                ),
+                tokens=self._count_messages_tokens(messages) + COMPLETION_TOKENS,
+                max_retries=self.max_retries
+            )
+        except Exception as e:
+            logger.error(f"API call failed: {e}")
+            raise
+        return resp.choices[0].message.content
 
     def extract_key_aspects(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -122,17 +144,17 @@ class LLMAsJudge:
             }'''
         )
 
+        # без дублей (paragraphs/full_text при наличии main_text) и служебных полей;
+        # поля укладываются в бюджет токенов по важности, JSON всегда целый
         user_message = (
             "Контент посадочной страницы:\n" +
-            json.dumps(parsed_data, ensure_ascii=False, indent=2)
+            pack_page(compact_page(parsed_data), self.content_token_budget, self.token_counter)
         )
-        if len(user_message) > 9000:
-            user_message = user_message[:9000]   
-        #used = self._count_messages_tokens(system_prompt, user_message)
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message}
         ]
+        logger.info(f"Запрос к LLM: ~{self._count_messages_tokens(messages)} токенов")
         last_error = None
         response_content = None
         
@@ -145,8 +167,7 @@ class LLMAsJudge:
                 )
                 # chat_response = self.client.chat.complete(model=self.model, messages=messages, temperature=0)
                 # response_content = response_content.choices[0].message.content
-                json_block = self._extract_json(response_content)
-                obj = KeyAspectsModel.parse_raw(json_block)
+                obj = self._parse_aspects(response_content)
                 result = obj.dict()
                 logger.info("Успешно получили и валидаировали JSON от LLM.")
                 if self._is_telegram():
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from parsers.store import Shared, SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache(SQLiteStore):
+    """
+    Постоянный кэш ответов LLM, адресуемый содержимым запроса.
+
+    Ключ — sha256 от (model, messages, temperature, top_p): одинаковый запрос
+    (повторный прогон Streamlit, повторная строка в пакете) не идёт в API.
+      - ttl: срок жизни ответа в секундах;
+      - max_bytes: предел суммарного размера сжатых ответов; сверх него
+        вытесняются давно не использованные записи (LRU).
+    Счётчики hits/misses доступны через stats().
+    """
+    DEFAULT_PATH = os.path.join(".cache", "llm_cache.sqlite")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "key TEXT PRIMARY KEY, model TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)",
+    )
+    TTL = 7 * 24 * 3600
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        super().__init__(path)
+        self.ttl = ttl or self.TTL
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], temperature: float, top_p: float) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "top_p": top_p},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """:return: Сохранённый ответ или None (нет записи или она устарела)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, created_at, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._released("responses", row[2])
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def set(self, key: str, model: str, content: str) -> None:
+        body = zlib.compress(content.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            replaced = self._stored_size("responses", "key", key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, body, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, body, len(body), now, now)
+            )
+            self._evict_lru("responses", "key", self.max_bytes, len(body) - replaced)
+
+    def stats(self) -> Dict[str, float]:
+        """Счётчики кэша за время жизни процесса: hits, misses, hit_rate и число записей."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        requests_total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests_total if requests_total else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._lru_bytes.pop("responses", None)
+            self.hits = self.misses = 0
+
+
+_cache: Shared[LLMResponseCache] = Shared(LLMResponseCache)
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Возвращает общий для процесса кэш ответов LLM, открывая его при первом обращении."""
+    return _cache.get()
+
+
+def configure_llm_cache(**kwargs) -> LLMResponseCache:
+    """Открывает общий кэш ответов LLM с другими настройками (см. LLMResponseCache)."""
+    return _cache.configure(**kwargs)
+
+
+def should_cache(temperature: float, cache_sampled: bool = False) -> bool:
+    """
+    Детерминированные запросы (temperature=0) кэшируются всегда; с сэмплированием —
+    только по явному согласию, иначе «перегенерировать» вернуло бы тот же ответ.
+    """
+    return temperature == 0 or cache_sampled
+
+
+def cached_completion(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    top_p: float,
+    request: Callable[[], str],
+    cache_sampled: bool = False,
+    validate: Optional[Callable[[str], bool]] = None
+) -> str:
+    """
+    Возвращает ответ LLM из кэша или через request() с сохранением.
+
+    :param request: Функция без аргументов, выполняющая запрос к API.
+    :param cache_sampled: Кэшировать и запросы с temperature > 0.
+    :param validate: Проверка ответа вызывающим (JSON разобрался, схема сошлась);
+                     ответ, не прошедший её, не сохраняется и не вернётся из кэша
+                     при повторе. None — сохранять любой непустой ответ.
+    """
+    if not should_cache(temperature, cache_sampled):
+        return request()
+    cache = get_llm_cache()
+    key = cache.make_key(model, messages, temperature, top_p)
+    content = cache.get(key)
+    if content is not None:
+        logger.info(f"Ответ LLM взят из кэша ({model})")
+        return content
+    content = request()
+    _store(cache, key, model, content, validate)
+    return content
+
+
+async def acached_completion(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    top_p: float,
+    request: Callable[[], Awaitable[str]],
+    cache_sampled: bool = False,
+    validate: Optional[Callable[[str], bool]] = None
+) -> str:
+    """Асинхронный аналог cached_completion: request() возвращает корутину."""
+    if not should_cache(temperature, cache_sampled):
+        return await request()
+    cache = get_llm_cache()
+    key = cache.make_key(model, messages, temperature, top_p)
+    content = cache.get(key)
+    if content is not None:
+        logger.info(f"Ответ LLM взят из кэша ({model})")
+        return content
+    content = await request()
+    _store(cache, key, model, content, validate)
+    return content
+
+
+def _store(
+    cache: LLMResponseCache,
+    key: str,
+    model: str,
+    content: str,
+    validate: Optional[Callable[[str], bool]]
+) -> None:
+    if not content:
+        return
+    if validate is not None and not validate(content):
+        logger.info(f"Ответ LLM не прошёл проверку и не сохранён в кэш ({model})")
+        return
+    cache.set(key, model, content)
@@ -0,0 +1,224 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from parsers.store import Shared, SQLiteStore
+from parsers.throttle import parse_retry_after
+from prompt_packer import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Ожидаемая длина ответа в токенах: резервируется заранее и уточняется
+# по usage из ответа API.
+COMPLETION_TOKENS = 512
+
+
+class LLMRateLimiter(SQLiteStore):
+    """
+    Общий лимит запросов к LLM API для всех потоков и процессов (SQLite).
+
+    Скользящее окно WINDOW секунд: не больше rpm запросов и tpm токенов.
+    Запрос, который не помещается в окно, ждёт своей очереди, а не падает.
+    После 429 пауза (Retry-After или экспоненциальная с джиттером) записывается
+    в общую базу, и её соблюдают все воркеры, а не только получивший ответ.
+      - rpm / tpm: запросов и токенов в минуту на весь ключ API;
+      - JITTER: случайная добавка к ожиданию, чтобы воркеры не просыпались разом.
+    """
+    DEFAULT_PATH = os.path.join(".cache", "llm_limiter.sqlite")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS requests ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, tokens INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS requests_ts ON requests (ts)",
+        "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value REAL NOT NULL)",
+    )
+    # BEGIN IMMEDIATE ждёт, пока другой процесс закончит резервирование
+    TIMEOUT = 30.0
+    WINDOW = 60.0
+    RPM = 60
+    TPM = 500_000
+    JITTER = 0.5
+    BACKOFF_BASE = 1.0
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, path: Optional[str] = None, rpm: Optional[int] = None, tpm: Optional[int] = None) -> None:
+        super().__init__(path)
+        self.rpm = rpm or self.RPM
+        self.tpm = tpm or self.TPM
+
+    def reserve(self, tokens: int) -> Tuple[Optional[int], float]:
+        """
+        Пытается занять место в окне.
+
+        :return: (id записи, 0) при успехе или (None, сколько ждать) — без блокировки.
+        """
+        tokens = min(tokens, self.tpm)
+        with self._lock:
+            # BEGIN IMMEDIATE сериализует резервирование между процессами
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                start = now - self.WINDOW
+                self._conn.execute("DELETE FROM requests WHERE ts <= ?", (start,))
+                row = self._conn.execute("SELECT value FROM state WHERE key = 'blocked_until'").fetchone()
+                blocked = (row[0] - now) if row else 0.0
+                if blocked > 0:
+                    return None, blocked
+                rows = self._conn.execute("SELECT ts, tokens FROM requests ORDER BY ts").fetchall()
+                wait = 0.0
+                if len(rows) >= self.rpm:
+                    wait = rows[len(rows) - self.rpm][0] - start
+                used = sum(t for _, t in rows)
+                if used + tokens > self.tpm:
+                    # ждём, пока из окна выйдет достаточно старых токенов
+                    for ts, spent in rows:
+                        used -= spent
+                        if used + tokens <= self.tpm:
+                            wait = max(wait, ts - start)
+                            break
+                if wait > 0:
+                    return None, wait
+                cursor = self._conn.execute("INSERT INTO requests (ts, tokens) VALUES (?, ?)", (now, tokens))
+                return cursor.lastrowid, 0.0
+            finally:
+                self._conn.execute("COMMIT")
+
+    def settle(self, reservation: Optional[int], tokens: int) -> None:
+        """Заменяет оценку токенов запроса фактическим расходом из ответа API."""
+        if reservation is None:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE requests SET tokens = ? WHERE id = ?", (min(tokens, self.tpm), reservation))
+
+    def acquire(self, tokens: int) -> int:
+        """Блокирует поток, пока запрос не поместится в лимиты. :return: id записи для settle."""
+        while True:
+            reservation, wait = self.reserve(tokens)
+            if reservation is not None:
+                return reservation
+            time.sleep(wait + random.uniform(0, self.JITTER))
+
+    async def aacquire(self, tokens: int) -> int:
+        """
+        Асинхронный аналог acquire: ждёт, не блокируя event loop. Сама транзакция
+        SQLite (BEGIN IMMEDIATE может ждать чужой процесс до TIMEOUT) идёт в потоке.
+        """
+        while True:
+            reservation, wait = await asyncio.to_thread(self.reserve, tokens)
+            if reservation is not None:
+                return reservation
+            await asyncio.sleep(wait + random.uniform(0, self.JITTER))
+
+    def penalize(self, retry_after: Optional[float], attempt: int) -> float:
+        """
+        Ставит общую паузу после 429: Retry-After, если API его прислал,
+        иначе экспоненциальную с полным джиттером.
+
+        :return: Длительность паузы в секундах.
+        """
+        if retry_after is None:
+            retry_after = random.uniform(0, min(self.MAX_BACKOFF, self.BACKOFF_BASE * (2 ** attempt)))
+        until = time.time() + retry_after
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO state (key, value) VALUES ('blocked_until', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (until,)
+            )
+        return retry_after
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM requests")
+            self._conn.execute("DELETE FROM state")
+
+
+_limiter: Shared[LLMRateLimiter] = Shared(LLMRateLimiter)
+
+
+def get_llm_limiter() -> LLMRateLimiter:
+    """Возвращает общий для процесса лимитер запросов к LLM, открывая его при первом обращении."""
+    return _limiter.get()
+
+
+def configure_llm_limiter(**kwargs) -> LLMRateLimiter:
+    """Открывает общий лимитер с другими настройками (см. LLMRateLimiter)."""
+    return _limiter.configure(**kwargs)
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    """Ошибка SDK из-за превышения лимита (HTTP 429)."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "raw_response", None), "status_code", None)
+    return status == 429 if status is not None else "429" in str(exc)
+
+
+def retry_after_of(exc: Exception) -> Optional[float]:
+    """Retry-After из ответа, приложенного к ошибке SDK, или None."""
+    response = getattr(exc, "raw_response", None)
+    if response is None:
+        response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    return parse_retry_after(headers.get("Retry-After")) if headers is not None else None
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]]) -> int:
+    """Оценка токенов запроса для лимитера: промпт и ожидаемый ответ."""
+    return get_token_counter().count_messages(messages) + COMPLETION_TOKENS
+
+
+def _used_tokens(resp: Any) -> Optional[int]:
+    return getattr(getattr(resp, "usage", None), "total_tokens", None)
+
+
+def limited_call(request: Callable[[], T], tokens: int, max_retries: int) -> T:
+    """
+    Выполняет запрос к LLM через общий лимитер.
+    На 429 ставит общую паузу и повторяет, не больше max_retries раз.
+
+    :param request: Функция без аргументов, возвращающая ответ SDK.
+    :param tokens: Оценка токенов запроса (промпт и ожидаемый ответ).
+    """
+    limiter = get_llm_limiter()
+    attempt = 0
+    while True:
+        reservation = limiter.acquire(tokens)
+        try:
+            resp = request()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt >= max_retries:
+                raise
+            wait = limiter.penalize(retry_after_of(e), attempt)
+            logger.warning(f"Получен 429, общая пауза {wait:.1f}s (попытка {attempt+1})")
+            attempt += 1
+            continue
+        used = _used_tokens(resp)
+        if used:
+            limiter.settle(reservation, used)
+        return resp
+
+
+async def alimited_call(request: Callable[[], Awaitable[T]], tokens: int, max_retries: int) -> T:
+    """Асинхронный аналог limited_call: обращения к базе лимитера идут в потоке, а не в event loop."""
+    limiter = get_llm_limiter()
+    attempt = 0
+    while True:
+        reservation = await limiter.aacquire(tokens)
+        try:
+            resp = await request()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt >= max_retries:
+                raise
+            wait = await asyncio.to_thread(limiter.penalize, retry_after_of(e), attempt)
+            logger.warning(f"Получен 429, общая пауза {wait:.1f}s (попытка {attempt+1})")
+            attempt += 1
+            continue
+        used = _used_tokens(resp)
+        if used:
+            await asyncio.to_thread(limiter.settle, reservation, used)
+        return resp
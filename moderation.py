@@ -1,20 +1,54 @@
 import re
 import json
-import time
+import asyncio
 import logging
+import weakref
 from urllib.parse import urlparse
 import textwrap
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, Iterator, List, Tuple
+
+from creative_fixer import get_local_fixer
+from json_stream import JSONObjectStream
+from llm_cache import acached_completion, cached_completion, get_llm_cache, should_cache
+from llm_limiter import COMPLETION_TOKENS, alimited_call, estimate_request_tokens, limited_call
+from stopwords import find_stopwords
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Сколько запросов к LLM одновременно в полёте на весь процесс (асинхронный путь).
+LLM_CONCURRENCY = 4
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_llm_concurrency = LLM_CONCURRENCY
+
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """
+    Возвращает общий семафор запросов к LLM для текущего event loop:
+    все CreativeGenerator процесса делят один лимит параллельности.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_llm_concurrency)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+def configure_llm_concurrency(concurrency: int) -> None:
+    """Задаёт лимит параллельных запросов к LLM для семафоров, созданных после вызова."""
+    global _llm_concurrency
+    _llm_concurrency = concurrency
+
+
 class JSONParseError(Exception):
     pass
 
 class CreativeGenerator:
     """
-    Генерирует креативы с итеративной валидацией и самокоррекцией без автоматического тримминга:
+    Генерирует креативы с итеративной валидацией и самокоррекцией без обрезки текста
+    посередине (превышение длины сначала исправляется локально, см. creative_fixer):
       - Заголовок ≤40 символов;
       - Текст ≤160 символов;
       - Telegram-заголовок фиксирован;
@@ -25,11 +59,32 @@ class CreativeGenerator:
     RETRY_DELAY = 1
     MAX_RETRIES = 3
     MAX_SELF_CORRECTIONS = 2
+    STYLES = ("Стиль 1", "Стиль 2", "Стиль 3")
 
-    def __init__(self, client, model, url: str):
+    def __init__(
+        self,
+        client,
+        model,
+        url: str,
+        cache_sampled: bool = False,
+        batch_corrections: bool = True,
+        local_fixes: bool = True
+    ):
+        """
+        :param cache_sampled: Кэшировать и ответы с temperature > 0 (см. llm_cache);
+                              по умолчанию генерация с сэмплированием всегда идёт в API.
+        :param batch_corrections: Исправлять все стили с ошибками одним запросом
+                                  за раунд (см. _self_correct_batch).
+        :param local_fixes: Сначала пытаться исправить превышение длины локально,
+                            без запроса к LLM (см. creative_fixer).
+        """
         self.client = client
         self.model = model
         self.url = url
+        self.cache_sampled = cache_sampled
+        self.batch_corrections = batch_corrections
+        self.local_fixes = local_fixes
+        self.local_fixer = get_local_fixer()
 
     def _is_telegram(self) -> bool:
         return "t.me" in urlparse(self.url).netloc
@@ -97,28 +152,202 @@ class CreativeGenerator:
             errs.append("contains 'ты'; use 'вы'")
         return errs
     
+    def _has_json(self, content: str) -> bool:
+        """Проверка ответа перед сохранением в кэш: ответ без JSON не кэшируется."""
+        return self._parse_content(content) is not None
+
     def _api_call(self, messages, temperature, top_p):
-        retries = 0
-        while True:
-            try:
-                resp = self.client.chat.complete(
+        return cached_completion(
+            self.model, messages, temperature, top_p,
+            lambda: self._complete(messages, temperature, top_p),
+            cache_sampled=self.cache_sampled,
+            validate=self._has_json
+        )
+
+    def _complete(self, messages, temperature, top_p):
+        try:
+            resp = limited_call(
+                lambda: self.client.chat.complete(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    top_p=top_p,
+                    stream=False
+                ),
+                tokens=estimate_request_tokens(messages),
+                max_retries=self.MAX_RETRIES
+            )
+        except Exception as e:
+            logger.error(f"API call failed: {e}")
+            raise
+        return resp.choices[0].message.content
+
+    async def _aapi_call(self, messages, temperature, top_p):
+        return await acached_completion(
+            self.model, messages, temperature, top_p,
+            lambda: self._acomplete(messages, temperature, top_p),
+            cache_sampled=self.cache_sampled,
+            validate=self._has_json
+        )
+
+    async def _acomplete(self, messages, temperature, top_p):
+        async def request():
+            # место в лимите берётся до семафора: ожидающий запрос не занимает слот
+            async with get_llm_semaphore():
+                return await self.client.chat.complete_async(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
                     top_p=top_p,
                     stream=False
                 )
-                return resp.choices[0].message.content
-            except Exception as e:
-                err = str(e)
-                if '429' in err and retries < self.MAX_RETRIES:
-                    wait = self.RETRY_DELAY * (2 ** retries)
-                    logger.warning(f"429 received, retrying after {wait}s...")
-                    time.sleep(wait)
-                    retries += 1
-                    continue
-                logger.error(f"API call failed: {e}")
-                raise
+        try:
+            resp = await alimited_call(request, tokens=estimate_request_tokens(messages), max_retries=self.MAX_RETRIES)
+        except Exception as e:
+            logger.error(f"API call failed: {e}")
+            raise
+        return resp.choices[0].message.content
+
+    def _api_call_n(self, messages, temperature, top_p, n: int) -> List[str]:
+        """
+        n вариантов ответа одним запросом (параметр n API). Кэш ответов
+        не используется: набор сэмплов не имеет смысла повторять.
+        """
+        try:
+            resp = limited_call(
+                lambda: self.client.chat.complete(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    top_p=top_p,
+                    n=n,
+                    stream=False
+                ),
+                tokens=estimate_request_tokens(messages) + COMPLETION_TOKENS * (n - 1),
+                max_retries=self.MAX_RETRIES
+            )
+        except Exception as e:
+            logger.error(f"API call failed: {e}")
+            raise
+        return [choice.message.content for choice in resp.choices]
+
+    async def _aapi_call_n(self, messages, temperature, top_p, n: int) -> List[str]:
+        """Асинхронный аналог _api_call_n."""
+        async def request():
+            async with get_llm_semaphore():
+                return await self.client.chat.complete_async(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    top_p=top_p,
+                    n=n,
+                    stream=False
+                )
+        try:
+            resp = await alimited_call(
+                request,
+                tokens=estimate_request_tokens(messages) + COMPLETION_TOKENS * (n - 1),
+                max_retries=self.MAX_RETRIES
+            )
+        except Exception as e:
+            logger.error(f"API call failed: {e}")
+            raise
+        return [choice.message.content for choice in resp.choices]
+
+    def _parse_content(self, content: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """:return: JSON из ответа модели или None, если его там нет или он битый."""
+        try:
+            return self._safe_load(self._extract_json(content or ""))
+        except JSONParseError:
+            return None
+
+    def _score_candidate(self, blk: Dict[str, str], references: List[str]) -> Tuple[int, int, float]:
+        """
+        Локальная оценка варианта, больше — лучше:
+        нет стоп-слов → нет ошибок _validate → новизна относительно references
+        (1 минус наибольшая доля общих слов, см. _novelty).
+        """
+        headline, ad_text = blk.get("headline", ""), blk.get("ad_text", "")
+        text = f"{headline} {ad_text}"
+        return (
+            -len(find_stopwords(text)),
+            -len(self._validate(headline, ad_text)),
+            self._novelty(text, references),
+        )
+
+    @staticmethod
+    def _novelty(text: str, references: List[str]) -> float:
+        words = set(re.findall(r"\w+", text.lower()))
+        if not words:
+            return 0.0
+        overlap = 0.0
+        for ref in references:
+            ref_words = set(re.findall(r"\w+", ref.lower()))
+            if ref_words:
+                overlap = max(overlap, len(words & ref_words) / len(words | ref_words))
+        return 1.0 - overlap
+
+    def _best_of(self, contents: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Выбирает для каждого стиля лучший из вариантов (см. _score_candidate).
+        Новизна считается только относительно уже выбранных стилей, чтобы стили
+        не повторяли друг друга; совпадение с промптом клиента не штрафуется —
+        его ключевые преимущества креатив и должен повторять.
+        """
+        candidates = [data for data in map(self._parse_content, contents) if isinstance(data, dict)]
+        styles = list(dict.fromkeys(style for data in candidates for style in data))
+        chosen: Dict[str, Dict[str, str]] = {}
+        for style in styles:
+            options = [data[style] for data in candidates if isinstance(data.get(style), dict)]
+            references = [f"{b.get('headline', '')} {b.get('ad_text', '')}" for b in chosen.values()]
+            best = max(options, key=lambda blk: self._score_candidate(blk, references))
+            chosen[style] = {"headline": best.get("headline", ""), "ad_text": best.get("ad_text", "")}
+        logger.info(f"Выбраны лучшие из {len(candidates)} вариантов")
+        return chosen
+
+    def _correction_prompt(self, style: str, headline: str, ad_text: str, errors: List[str]) -> str:
+        return textwrap.dedent(f"""
+            Исправь креатив, чтобы:
+            - headline длиной ≤ {self.MAX_HEADLINE} символов;
+            - ad_text длиной ≤ {self.MAX_AD_TEXT} символов;
+            - не было обращения "ты", CAPS LOCK, латиницы;
+            Сохрани смысл и ключевые преимущества.
+
+            Текущий вариант (стиль {style}) с ошибками {errors}:
+            headline: "{headline}"
+            ad_text: "{ad_text}"
+
+            Верни только JSON {{"{style}": {{"headline": "...", "ad_text": "..."}}}}.
+        """)
+
+    def _apply_correction(self, content: str, style: str, headline: str, ad_text: str) -> Dict[str, str]:
+        """
+        Достаёт исправленный стиль из ответа; отсутствующие поля остаются прежними,
+        как и весь стиль, если вместо объекта модель вернула что-то другое.
+
+        :raises JSONParseError: если в ответе нет JSON.
+        """
+        data = self._safe_load(self._extract_json(content)) or {}
+        new = data.get(style)
+        if not isinstance(new, dict):
+            new = {}
+        return {"headline": new.get("headline", headline), "ad_text": new.get("ad_text", ad_text)}
+
+    def _local_fix(self, blk: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Локальное исправление длины (см. creative_fixer.LocalFixer); None — нужна LLM."""
+        if not self.local_fixes:
+            return None
+        return self.local_fixer.fix(blk["headline"], blk["ad_text"], self.MAX_HEADLINE, self.MAX_AD_TEXT, self._validate)
+
+    def _apply_local_fixes(self, creatives: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """Исправляет локально все стили с ошибками, для которых это возможно."""
+        fixed = dict(creatives)
+        for style, blk in creatives.items():
+            if self._validate(blk["headline"], blk["ad_text"]):
+                local = self._local_fix(blk)
+                if local is not None:
+                    fixed[style] = local
+        return fixed
 
     def _self_correct(
         self,
@@ -129,72 +358,164 @@ class CreativeGenerator:
         judge_out: Dict[str, str],
         errors: List[str]
     ) -> Dict[str, str]:
-        curr_h, curr_t = headline, ad_text
+        curr = {"headline": headline, "ad_text": ad_text}
         for attempt in range(self.MAX_SELF_CORRECTIONS):
-            errors = self._validate(curr_h, curr_t)
+            errors = self._validate(curr["headline"], curr["ad_text"])
             if not errors:
                 break
-            corr_prompt = textwrap.dedent(f"""
-                Исправь креатив, чтобы:
-                - headline длиной ≤ {self.MAX_HEADLINE} символов;
-                - ad_text длиной ≤ {self.MAX_AD_TEXT} символов;
-                - не было обращения "ты", CAPS LOCK, латиницы;
-                Сохрани смысл и ключевые преимущества.
-
-                Текущий вариант (стиль {style}) с ошибками {errors}:
-                headline: "{headline}"
-                ad_text: "{ad_text}"
-
-                Верни только JSON {{"{style}": {{"headline": "...", "ad_text": "..."}}}}.
-            """)
+            local = self._local_fix(curr)
+            if local is not None:
+                curr = local
+                break
+            corr_prompt = self._correction_prompt(style, curr["headline"], curr["ad_text"], errors)
             content = self._api_call([{"role":"system","content":corr_prompt}], 0.2, 1.0)
             try:
-                # resp = self.client.chat.complete(
-                #     model=self.model,
-                #     messages=messages,
-                #     temperature=0.2,
-                #     top_p=1.0,
-                #     stream=False
-                # )
-                # raw = resp.choices[0].message.content
-                json_block = self._extract_json(content)
-                data = self._safe_load(json_block)
-                new = data.get(style, {"headline": curr_h, "ad_text": curr_t})
-                curr_h = new.get("headline", curr_h)
-                curr_t = new.get("ad_text", curr_t)
+                curr = self._apply_correction(content, style, curr["headline"], curr["ad_text"])
             except JSONParseError:
                 logger.warning(f"Self-correction JSON error on attempt {attempt+1}")
                 break
-        return {"headline": curr_h, "ad_text": curr_t}
-
-    def generate_creatives(self, customer_prompt: str, judge_out: Dict[str, str]) -> Dict[str, Dict[str, str]]:
-        content = self._api_call([{"role": "system", "content": self._build_prompt(customer_prompt, judge_out)}], 0.5, 0.9)
-        # resp = self.client.chat.complete(
-        #     model=self.model,
-        #     messages=[{"role": "system", "content": self._build_prompt(customer_prompt, judge_out)}],
-        #     temperature=0.5,
-        #     top_p=0.9,
-        #     stream=False
-        # )
-        # content = resp.choices[0].message.content
-        print(content)
-        # content = content.strip('```').split('```')[-1].strip()
-        # creatives = json.loads(content)
-        try:
-            json_block = self._extract_json(content)
-            creatives = self._safe_load(json_block)
-        except JSONParseError:
+        return curr
+
+    async def _aself_correct(
+        self,
+        style: str,
+        headline: str,
+        ad_text: str,
+        customer_prompt: str,
+        judge_out: Dict[str, str],
+        errors: List[str]
+    ) -> Dict[str, str]:
+        """Асинхронный аналог _self_correct."""
+        curr = {"headline": headline, "ad_text": ad_text}
+        for attempt in range(self.MAX_SELF_CORRECTIONS):
+            errors = self._validate(curr["headline"], curr["ad_text"])
+            if not errors:
+                break
+            local = self._local_fix(curr)
+            if local is not None:
+                curr = local
+                break
+            corr_prompt = self._correction_prompt(style, curr["headline"], curr["ad_text"], errors)
+            content = await self._aapi_call([{"role":"system","content":corr_prompt}], 0.2, 1.0)
+            try:
+                curr = self._apply_correction(content, style, curr["headline"], curr["ad_text"])
+            except JSONParseError:
+                logger.warning(f"Self-correction JSON error on attempt {attempt+1}")
+                break
+        return curr
+
+    def _batch_correction_prompt(self, failing: Dict[str, Dict[str, str]], errors: Dict[str, List[str]]) -> str:
+        variants = "\n".join(
+            f'{style} (ошибки {errors[style]}):\n'
+            f'headline: "{blk["headline"]}"\n'
+            f'ad_text: "{blk["ad_text"]}"'
+            for style, blk in failing.items()
+        )
+        keys = ", ".join(f'"{style}": {{"headline": "...", "ad_text": "..."}}' for style in failing)
+        return textwrap.dedent(f"""
+            Исправь креативы, чтобы в каждом:
+            - headline длиной ≤ {self.MAX_HEADLINE} символов;
+            - ad_text длиной ≤ {self.MAX_AD_TEXT} символов;
+            - не было обращения "ты", CAPS LOCK, латиницы;
+            Сохрани смысл, ключевые преимущества и стиль каждого варианта.
+
+            Текущие варианты с ошибками:
+        """) + variants + f"\n\nВерни только JSON {{{keys}}}.\n"
+
+    def _next_batch(self, creatives: Dict[str, Dict[str, str]]) -> Optional[List[Dict[str, str]]]:
+        """:return: Сообщения запроса на исправление всех стилей с ошибками или None, если ошибок нет."""
+        errors = {style: self._validate(blk["headline"], blk["ad_text"]) for style, blk in creatives.items()}
+        failing = {style: creatives[style] for style, errs in errors.items() if errs}
+        if not failing:
+            return None
+        return [{"role": "system", "content": self._batch_correction_prompt(failing, errors)}]
+
+    def _apply_batch(self, content: str, creatives: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Раскладывает ответ на пакетное исправление по стилям. Берутся только
+        стили, отправленные на исправление; стили, которых нет в ответе или которые
+        пришли не объектом, остаются прежними.
+
+        :raises JSONParseError: если в ответе нет JSON.
+        """
+        data = self._safe_load(self._extract_json(content)) or {}
+        merged = dict(creatives)
+        for style, blk in creatives.items():
+            if not self._validate(blk["headline"], blk["ad_text"]):
+                continue
+            new = data.get(style)
+            if not isinstance(new, dict):
+                continue
+            merged[style] = {"headline": new.get("headline", blk["headline"]), "ad_text": new.get("ad_text", blk["ad_text"])}
+        return merged
+
+    def _self_correct_batch(self, creatives: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Пакетная самокоррекция: все стили с ошибками уходят в одном запросе,
+        ответ раскладывается по стилям. Тот же цикл валидации и тот же предел
+        попыток MAX_SELF_CORRECTIONS, что и у _self_correct, но один вызов за раунд.
+        """
+        curr = dict(creatives)
+        for attempt in range(self.MAX_SELF_CORRECTIONS):
+            curr = self._apply_local_fixes(curr)
+            messages = self._next_batch(curr)
+            if messages is None:
+                break
+            content = self._api_call(messages, 0.2, 1.0)
+            try:
+                curr = self._apply_batch(content, curr)
+            except JSONParseError:
+                logger.warning(f"Batch self-correction JSON error on attempt {attempt+1}")
+                break
+        return curr
+
+    async def _aself_correct_batch(self, creatives: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """Асинхронный аналог _self_correct_batch."""
+        curr = dict(creatives)
+        for attempt in range(self.MAX_SELF_CORRECTIONS):
+            curr = self._apply_local_fixes(curr)
+            messages = self._next_batch(curr)
+            if messages is None:
+                break
+            content = await self._aapi_call(messages, 0.2, 1.0)
+            try:
+                curr = self._apply_batch(content, curr)
+            except JSONParseError:
+                logger.warning(f"Batch self-correction JSON error on attempt {attempt+1}")
+                break
+        return curr
+
+    def generate_creatives(
+        self,
+        customer_prompt: str,
+        judge_out: Dict[str, str],
+        n: int = 1
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        :param n: Сколько вариантов запросить одним вызовом; для каждого стиля
+                  остаётся лучший (см. _best_of), что обычно избавляет от самокоррекции.
+        """
+        messages = [{"role": "system", "content": self._build_prompt(customer_prompt, judge_out)}]
+        if n > 1:
+            creatives = self._best_of(self._api_call_n(messages, 0.5, 0.9, n))
+        else:
+            content = self._api_call(messages, 0.5, 0.9)
+            print(content)
+            creatives = self._parse_content(content)
+        if not creatives:
             logger.info("Попытка автоисправления из-за неверного JSON")
-            fallback = {s: {"headline": "", "ad_text": ""} for s in ["Стиль 1","Стиль 2","Стиль 3"]}
+            fallback = {s: {"headline": "", "ad_text": ""} for s in self.STYLES}
             return fallback
         
         for style, blk in creatives.items():
             errors = self._validate(blk['headline'], blk['ad_text'])
             print(style, errors)
-            if errors:
+            if errors and not self.batch_corrections:
                 creatives[style] = self._self_correct(
                     style, blk['headline'], blk['ad_text'], customer_prompt, judge_out, errors
                 )
+        if self.batch_corrections:
+            creatives = self._self_correct_batch(creatives)
         
         if self._is_telegram():
             brand = judge_out.get('brand_name', '')
@@ -206,24 +527,17 @@ class CreativeGenerator:
         self,
         customer_prompt: str,
         judge_out: Dict[str, str],
-        style: str
+        style: str,
+        n: int = 1
     ) -> Dict[str, str]:
-        content = self._api_call([{"role": "system", "content": self._build_prompt(customer_prompt, judge_out, style)}], 0.5, 0.9)
-        # resp = self.client.chat.complete(
-        #     model=self.model,
-        #     messages=[{"role": "system", "content": self._build_prompt(customer_prompt, judge_out, style)}],
-        #     temperature=0.5,
-        #     top_p=0.9,
-        #     stream=False
-        # )
-        # raw = resp.choices[0].message.content
-        # raw = raw.strip('```').split('```')[-1].strip()
-        # data = json.loads(raw)
-        try:
-            json_block = self._extract_json(content)
-            data = self._safe_load(json_block)
-            blk = data.get(style, {"headline": "", "ad_text": ""})
-        except JSONParseError:
+        """:param n: Сколько вариантов запросить одним вызовом (см. generate_creatives)."""
+        messages = [{"role": "system", "content": self._build_prompt(customer_prompt, judge_out, style)}]
+        if n > 1:
+            blk = self._best_of(self._api_call_n(messages, 0.5, 0.9, n)).get(style)
+        else:
+            data = self._parse_content(self._api_call(messages, 0.5, 0.9))
+            blk = data.get(style, {"headline": "", "ad_text": ""}) if data is not None else None
+        if blk is None:
             logger.info(f"Попытка самокоррекции стиля {style} из-за неверного JSON")
             return self._self_correct(style, "", "", customer_prompt, judge_out, ["invalid JSON"])
         
@@ -236,6 +550,269 @@ class CreativeGenerator:
             blk['headline'] = judge_out.get('brand_name', '')
         return blk
 
+
+    async def agenerate_creatives(
+        self,
+        customer_prompt: str,
+        judge_out: Dict[str, str],
+        n: int = 1
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Асинхронный аналог generate_creatives. С batch_corrections стили с ошибками
+        исправляются одним запросом за раунд, иначе — параллельно (под общим
+        семафором LLM), так что время ответа определяется самым долгим стилем.
+        """
+        messages = [{"role": "system", "content": self._build_prompt(customer_prompt, judge_out)}]
+        if n > 1:
+            creatives = self._best_of(await self._aapi_call_n(messages, 0.5, 0.9, n))
+        else:
+            creatives = self._parse_content(await self._aapi_call(messages, 0.5, 0.9))
+        if not creatives:
+            logger.info("Попытка автоисправления из-за неверного JSON")
+            fallback = {s: {"headline": "", "ad_text": ""} for s in self.STYLES}
+            return fallback
+
+        async def fix(style: str, blk: Dict[str, str]) -> Dict[str, str]:
+            errors = self._validate(blk['headline'], blk['ad_text'])
+            if not errors:
+                return blk
+            return await self._aself_correct(
+                style, blk['headline'], blk['ad_text'], customer_prompt, judge_out, errors
+            )
+
+        if self.batch_corrections:
+            creatives = await self._aself_correct_batch(creatives)
+        else:
+            styles = list(creatives)
+            fixed = await asyncio.gather(*(fix(style, creatives[style]) for style in styles))
+            creatives = dict(zip(styles, fixed))
+
+        if self._is_telegram():
+            brand = judge_out.get('brand_name', '')
+            for s in creatives:
+                creatives[s]['headline'] = brand
+        return creatives
+
+    async def agenerate_style(
+        self,
+        customer_prompt: str,
+        judge_out: Dict[str, str],
+        style: str,
+        n: int = 1
+    ) -> Dict[str, str]:
+        """Асинхронный аналог generate_style."""
+        messages = [{"role": "system", "content": self._build_prompt(customer_prompt, judge_out, style)}]
+        if n > 1:
+            blk = self._best_of(await self._aapi_call_n(messages, 0.5, 0.9, n)).get(style)
+        else:
+            data = self._parse_content(await self._aapi_call(messages, 0.5, 0.9))
+            blk = data.get(style, {"headline": "", "ad_text": ""}) if data is not None else None
+        if blk is None:
+            logger.info(f"Попытка самокоррекции стиля {style} из-за неверного JSON")
+            return await self._aself_correct(style, "", "", customer_prompt, judge_out, ["invalid JSON"])
+
+        errors = self._validate(blk['headline'], blk['ad_text'])
+        if errors:
+            blk = await self._aself_correct(
+                style, blk['headline'], blk['ad_text'], customer_prompt, judge_out, errors
+            )
+        if self._is_telegram():
+            blk['headline'] = judge_out.get('brand_name', '')
+        return blk
+
+    @staticmethod
+    def _delta(event) -> str:
+        content = event.data.choices[0].delta.content
+        return content if isinstance(content, str) else ""
+
+    def _stream_call(self, messages, temperature, top_p) -> Iterator[str]:
+        """
+        Потоковый запрос к API: отдаёт текст ответа по кускам.
+        Ответ из кэша (см. llm_cache) отдаётся одним куском; полный ответ с JSON сохраняется в кэш.
+        """
+        cache = get_llm_cache() if should_cache(temperature, self.cache_sampled) else None
+        key = cache.make_key(self.model, messages, temperature, top_p) if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        stream = limited_call(
+            lambda: self.client.chat.stream(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                top_p=top_p
+            ),
+            tokens=estimate_request_tokens(messages),
+            max_retries=self.MAX_RETRIES
+        )
+        parts = []
+        for event in stream:
+            piece = self._delta(event)
+            parts.append(piece)
+            yield piece
+        content = "".join(parts)
+        if cache and content and self._has_json(content):
+            cache.set(key, self.model, content)
+
+    async def _astream_call(self, messages, temperature, top_p) -> AsyncIterator[str]:
+        """Асинхронный аналог _stream_call."""
+        cache = get_llm_cache() if should_cache(temperature, self.cache_sampled) else None
+        key = cache.make_key(self.model, messages, temperature, top_p) if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        semaphore = get_llm_semaphore()
+
+        async def request():
+            # слот семафора держится, пока поток не дочитан, а не только до первого ответа
+            await semaphore.acquire()
+            try:
+                return await self.client.chat.stream_async(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    top_p=top_p
+                )
+            except BaseException:
+                semaphore.release()
+                raise
+
+        stream = await alimited_call(request, tokens=estimate_request_tokens(messages), max_retries=self.MAX_RETRIES)
+        parts = []
+        try:
+            async for event in stream:
+                piece = self._delta(event)
+                parts.append(piece)
+                yield piece
+        finally:
+            semaphore.release()
+        content = "".join(parts)
+        if cache and content and self._has_json(content):
+            cache.set(key, self.model, content)
+
+    def _stream_block(self, blk: Optional[Dict[str, str]]) -> Tuple[Dict[str, str], bool]:
+        """
+        Стиль из потока: пустые поля вместо отсутствующих и локальное исправление длины.
+
+        :return: (креатив, нужна ли самокоррекция через LLM).
+        """
+        blk = {"headline": (blk or {}).get("headline", ""), "ad_text": (blk or {}).get("ad_text", "")}
+        if not self._validate(blk['headline'], blk['ad_text']):
+            return blk, False
+        local = self._local_fix(blk)
+        return (local, False) if local is not None else (blk, True)
+
+    def _with_brand(self, blk: Dict[str, str], judge_out: Dict[str, str]) -> Dict[str, str]:
+        if self._is_telegram():
+            blk['headline'] = judge_out.get('brand_name', '')
+        return blk
+
+    def stream_creatives(self, customer_prompt: str, judge_out: Dict[str, str]) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        Потоковая генерация: ответ модели разбирается по мере поступления
+        (см. json_stream), и каждый корректный стиль отдаётся, как только
+        закрылся его JSON-объект. Стили с ошибками, которые не исправились
+        локально, копятся и исправляются после конца потока — одним пакетным
+        запросом за раунд (batch_corrections) или по одному. Стили, которых
+        в ответе не оказалось, отдаются пустыми в конце.
+
+        :return: Итератор пар (стиль, {'headline', 'ad_text'}).
+        """
+        messages = [{"role": "system", "content": self._build_prompt(customer_prompt, judge_out)}]
+        parser = JSONObjectStream()
+        seen = set()
+        failing: Dict[str, Dict[str, str]] = {}
+        for piece in self._stream_call(messages, 0.5, 0.9):
+            for style, blk in parser.feed(piece):
+                if style in seen:
+                    continue
+                seen.add(style)
+                blk, needs_llm = self._stream_block(blk)
+                if needs_llm:
+                    failing[style] = blk
+                else:
+                    yield style, self._with_brand(blk, judge_out)
+        if failing:
+            if self.batch_corrections:
+                fixed = self._self_correct_batch(failing)
+            else:
+                fixed = {
+                    style: self._self_correct(
+                        style, blk['headline'], blk['ad_text'], customer_prompt, judge_out,
+                        self._validate(blk['headline'], blk['ad_text'])
+                    )
+                    for style, blk in failing.items()
+                }
+            for style in failing:
+                yield style, self._with_brand(fixed[style], judge_out)
+        for style in self.STYLES:
+            if style not in seen:
+                logger.info(f"Стиль {style} не найден в потоковом ответе")
+                yield style, {"headline": "", "ad_text": ""}
+
+    async def _acorrect_style(
+        self,
+        style: str,
+        blk: Dict[str, str],
+        customer_prompt: str,
+        judge_out: Dict[str, str]
+    ) -> Tuple[str, Dict[str, str]]:
+        errors = self._validate(blk['headline'], blk['ad_text'])
+        blk = await self._aself_correct(style, blk['headline'], blk['ad_text'], customer_prompt, judge_out, errors)
+        return style, self._with_brand(blk, judge_out)
+
+    async def astream_creatives(
+        self,
+        customer_prompt: str,
+        judge_out: Dict[str, str]
+    ) -> AsyncIterator[Tuple[str, Dict[str, str]]]:
+        """
+        Асинхронный аналог stream_creatives. Без batch_corrections самокоррекция
+        стиля запускается сразу после закрытия его объекта и идёт параллельно
+        с генерацией остальных; стили отдаются по мере готовности. Если
+        потребитель прекращает итерацию раньше, незавершённые коррекции отменяются.
+        """
+        messages = [{"role": "system", "content": self._build_prompt(customer_prompt, judge_out)}]
+        parser = JSONObjectStream()
+        seen = set()
+        failing: Dict[str, Dict[str, str]] = {}
+        pending = set()
+        try:
+            async for piece in self._astream_call(messages, 0.5, 0.9):
+                for style, blk in parser.feed(piece):
+                    if style in seen:
+                        continue
+                    seen.add(style)
+                    blk, needs_llm = self._stream_block(blk)
+                    if not needs_llm:
+                        yield style, self._with_brand(blk, judge_out)
+                    elif self.batch_corrections:
+                        failing[style] = blk
+                    else:
+                        pending.add(asyncio.create_task(self._acorrect_style(style, blk, customer_prompt, judge_out)))
+                for task in [task for task in pending if task.done()]:
+                    pending.discard(task)
+                    yield task.result()
+            if failing:
+                fixed = await self._aself_correct_batch(failing)
+                for style in failing:
+                    yield style, self._with_brand(fixed[style], judge_out)
+            for next_done in asyncio.as_completed(pending):
+                yield await next_done
+        finally:
+            unfinished = [task for task in pending if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.gather(*unfinished, return_exceptions=True)
+        for style in self.STYLES:
+            if style not in seen:
+                logger.info(f"Стиль {style} не найден в потоковом ответе")
+                yield style, {"headline": "", "ad_text": ""}
     
 # import json
 # import logging
@@ -98,11 +98,19 @@ if st.session_state.get("user_prompt"):
                 model=st.session_state["selected_model"],
                 url=url_input
             )
-            creatives = gen.generate_creatives(
+            # стили показываются по мере генерации, не дожидаясь всего ответа
+            preview = st.empty()
+            creatives = {}
+            for style, blk in gen.stream_creatives(
                 st.session_state["user_prompt"],
                 st.session_state["judge_output"]
-            )
-            st.session_state["generated_creatives"] = creatives
+            ):
+                creatives[style] = blk
+                with preview.container():
+                    for name, shown in creatives.items():
+                        st.markdown(f"**{name}**  \n{shown['headline']}  \n{shown['ad_text']}")
+            preview.empty()
+            st.session_state["generated_creatives"] = {s: creatives[s] for s in CreativeGenerator.STYLES}
             for i in (2, 3):
                 st.session_state[f"show_style{i}"] = False
 
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import weakref
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+from .download import ALLOWED_CONTENT_TYPES, CHUNK_SIZE, MAX_BYTES, aread_capped, charset_from_content_type, check_content_type
+from .session import DEFAULT_HEADERS
+from .throttle import get_throttle
+
+logger = logging.getLogger(__name__)
+
+
+class FetchResult(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    text: str
+    truncated: bool = False
+
+
+class AsyncFetcher:
+    """
+    Асинхронная загрузка страниц с ограничением параллельности.
+
+    Одна aiohttp-сессия на event loop:
+      - concurrency: сколько запросов одновременно в полёте на весь процесс;
+      - per_host: сколько соединений одновременно держим к одному хосту.
+    """
+    CONCURRENCY = 200
+    PER_HOST = 8
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        per_host: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.concurrency = concurrency or self.CONCURRENCY
+        self.per_host = per_host or self.PER_HOST
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+        return self._session
+
+    async def request(
+        self,
+        url: str,
+        timeout: float = 10,
+        connect_timeout: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        max_bytes: int = MAX_BYTES,
+        max_text_chars: Optional[int] = None,
+        allowed_types: Tuple[str, ...] = ALLOWED_CONTENT_TYPES
+    ) -> FetchResult:
+        """
+        Выполняет GET-запрос и возвращает статус, заголовки и текст ответа.
+        Тело читается потоково и обрывается по лимитам (см. parsers.download).
+
+        :param url: Адрес страницы.
+        :param timeout: Таймаут чтения ответа в секундах.
+        :param connect_timeout: Таймаут соединения; None — равен timeout.
+        :param headers: Дополнительные заголовки запроса.
+        :param max_bytes: Предел читаемых байт тела.
+        :param max_text_chars: Предел видимого текста; None — без него.
+        :param allowed_types: Допустимые Content-Type.
+        :return: FetchResult.
+        :raises aiohttp.ClientError: при сетевой ошибке или статусе >= 400.
+        :raises UnsupportedContentType: если ответ не текстовый.
+        """
+        throttle = get_throttle()
+        # токен хоста берётся до общего семафора: притормаживаемый хост не занимает слоты
+        await throttle.aacquire(url)
+        async with self._semaphore:
+            client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout or timeout, sock_read=timeout)
+            async with self.session.get(url, timeout=client_timeout, headers=headers) as resp:
+                throttle.report(url, resp.status, resp.headers.get("Retry-After"))
+                resp.raise_for_status()
+                content_type = resp.headers.get("Content-Type")
+                check_content_type(content_type, allowed_types)
+                text, truncated = await aread_capped(
+                    resp.content.iter_chunked(CHUNK_SIZE),
+                    charset_from_content_type(content_type),
+                    max_bytes,
+                    max_text_chars
+                )
+                return FetchResult(resp.status, resp.headers, text, truncated)
+
+    async def fetch(self, url: str, timeout: float = 10, connect_timeout: Optional[float] = None) -> str:
+        """
+        Загружает страницу и возвращает её текст.
+
+        :param url: Адрес страницы.
+        :param timeout: Таймаут чтения ответа в секундах.
+        :param connect_timeout: Таймаут соединения; None — равен timeout.
+        :return: Текст ответа.
+        :raises aiohttp.ClientError: при сетевой ошибке или статусе >= 400.
+        """
+        return (await self.request(url, timeout=timeout, connect_timeout=connect_timeout)).text
+
+    async def final_url(self, url: str, timeout: float = 5) -> str:
+        """
+        Проходит по редиректам и возвращает конечный адрес. Тело ответа не читается.
+        Ошибка конечной страницы после редиректа не мешает вернуть её адрес (см. SessionPool.final_url).
+
+        :raises aiohttp.ClientError: при сетевой ошибке или ответе 4xx/5xx без редиректа.
+        """
+        throttle = get_throttle()
+        await throttle.aacquire(url)
+        async with self._semaphore:
+            async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                throttle.report(url, resp.status, resp.headers.get("Retry-After"))
+                if not resp.history:
+                    resp.raise_for_status()
+                return str(resp.url)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_fetchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncFetcher]" = weakref.WeakKeyDictionary()
+_fetcher_settings: Dict[str, int] = {}
+
+
+def get_async_fetcher() -> AsyncFetcher:
+    """
+    Возвращает AsyncFetcher текущего event loop.
+    aiohttp-сессия и семафор привязаны к loop, поэтому на каждый loop — свой экземпляр.
+    """
+    loop = asyncio.get_running_loop()
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        fetcher = AsyncFetcher(**_fetcher_settings)
+        _fetchers[loop] = fetcher
+    return fetcher
+
+
+def configure_async_fetcher(concurrency: Optional[int] = None, per_host: Optional[int] = None) -> None:
+    """Задаёт лимиты для AsyncFetcher, которые будут созданы после вызова."""
+    _fetcher_settings.clear()
+    if concurrency:
+        _fetcher_settings["concurrency"] = concurrency
+    if per_host:
+        _fetcher_settings["per_host"] = per_host
+
+
+async def close_async_fetcher() -> None:
+    """Закрывает сессию AsyncFetcher текущего event loop."""
+    fetcher = _fetchers.pop(asyncio.get_running_loop(), None)
+    if fetcher is not None:
+        await fetcher.close()
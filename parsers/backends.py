@@ -0,0 +1,160 @@
+import os
+import re
+import logging
+from typing import Any, Dict, List, Optional, Pattern
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from .extract import extract_page, extract_page_lexbor
+from .store import Shared
+
+logger = logging.getLogger(__name__)
+
+
+class SoupBackend:
+    """
+    HTML-бэкенд на BeautifulSoup. Парсеры работают с деревом только через
+    методы бэкенда, поэтому построитель дерева можно менять без правок парсеров.
+
+    :param features: Построитель дерева BeautifulSoup ('html.parser', 'lxml').
+    """
+    name = "html.parser"
+
+    def __init__(self, features: str = "html.parser") -> None:
+        self.features = features
+
+    def parse(self, html: str, only: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        :param html: HTML-код.
+        :param only: Аргументы SoupStrainer: в дерево попадут только подходящие
+                     теги с содержимым, остальные узлы не создаются.
+        """
+        parse_only = SoupStrainer(**only) if only else None
+        return BeautifulSoup(html, self.features, parse_only=parse_only)
+
+    def select_one(self, node: Any, selector: str) -> Optional[Any]:
+        return node.select_one(selector)
+
+    def select(self, node: Any, selector: str) -> List[Any]:
+        return node.select(selector)
+
+    def text(self, node: Any, separator: str = "", strip: bool = False) -> str:
+        return node.get_text(separator, strip=strip)
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def extract_page(self, tree: Any) -> Dict[str, Any]:
+        return extract_page(tree)
+
+
+class LxmlBackend(SoupBackend):
+    """BeautifulSoup с C-построителем lxml: то же API, дерево строится в несколько раз быстрее."""
+    name = "lxml"
+
+    def __init__(self) -> None:
+        super().__init__("lxml")
+
+
+class SelectolaxBackend(SoupBackend):
+    """
+    Бэкенд на selectolax (lexbor, C): самый быстрый разбор и CSS-поиск,
+    без промежуточных Python-объектов на каждый узел.
+    """
+    name = "selectolax"
+
+    def __init__(self) -> None:
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser_cls = LexborHTMLParser
+
+    def parse(self, html: str, only: Optional[Dict[str, Any]] = None) -> Any:
+        # lexbor строит дерево целиком, но на C; фильтр only не нужен
+        return self._parser_cls(html)
+
+    def select_one(self, node: Any, selector: str) -> Optional[Any]:
+        return node.css_first(selector)
+
+    def select(self, node: Any, selector: str) -> List[Any]:
+        return node.css(selector)
+
+    def text(self, node: Any, separator: str = "", strip: bool = False) -> str:
+        return node.text(separator=separator, strip=strip)
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+    def extract_page(self, tree: Any) -> Dict[str, Any]:
+        return extract_page_lexbor(tree.root)
+
+
+_HEAD_END_RE = re.compile(r"</head\s*>", re.IGNORECASE)
+
+
+def head_only(html: str) -> str:
+    """
+    Обрезает документ по </head>: для извлечения <meta> тело страницы
+    не нужно ни токенизировать, ни строить.
+    """
+    match = _HEAD_END_RE.search(html)
+    return html[:match.end()] if match else html
+
+
+def class_pattern(name: str) -> Pattern:
+    """Регулярка открывающего тега с классом name в атрибуте class (среди прочих классов)."""
+    return re.compile(rf"""<\w+[^>]*?\bclass\s*=\s*["'](?:[^"']*\s)?{re.escape(name)}(?:\s[^"']*)?["']""", re.IGNORECASE)
+
+
+def cut_after(html: str, marker: Pattern, closing: str = "</div>", require: Optional[Pattern] = None) -> str:
+    """
+    Обрезает документ после первого closing, идущего за тегом, найденным по marker.
+    Незакрытые теги парсер закроет сам; если marker не найден, документ не меняется.
+
+    :param require: Что должно встретиться до marker (например, тег заголовка);
+                    если его там нет, документ не обрезается — иначе нужное отрежется.
+    """
+    match = marker.search(html)
+    if match is None:
+        return html
+    if require is not None and require.search(html, 0, match.start()) is None:
+        return html
+    end = html.find(closing, match.end())
+    return html if end == -1 else html[:end + len(closing)]
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend,
+    SelectolaxBackend.name: SelectolaxBackend,
+}
+
+_backend: Shared[SoupBackend] = Shared(lambda name=None: _create_backend(name or os.environ.get("HTML_BACKEND", SoupBackend.name)))
+
+
+def get_html_backend() -> SoupBackend:
+    """
+    Возвращает HTML-бэкенд процесса. По умолчанию берётся из переменной
+    окружения HTML_BACKEND ('html.parser', 'lxml', 'selectolax');
+    если нужная библиотека не установлена — откат на html.parser.
+    """
+    return _backend.get()
+
+
+def set_html_backend(name: str) -> SoupBackend:
+    """
+    Переключает HTML-бэкенд для всех парсеров.
+
+    :param name: 'html.parser', 'lxml' или 'selectolax'.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный HTML-бэкенд: {name}. Доступны: {', '.join(BACKENDS)}")
+    return _backend.configure(name=name)
+
+
+def _create_backend(name: str) -> SoupBackend:
+    try:
+        backend = BACKENDS[name]()
+        if name == LxmlBackend.name:
+            import lxml  # noqa: F401
+        return backend
+    except (ImportError, KeyError) as e:
+        logger.warning(f"HTML-бэкенд {name} недоступен ({e}), используется html.parser")
+        return SoupBackend()
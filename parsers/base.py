@@ -1,10 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
+import asyncio
 import logging
 import getpass
 import os
-import re
+
+from .aio import get_async_fetcher
+from .backends import get_html_backend
+from .density import main_content
+from .download import ALLOWED_CONTENT_TYPES, CHUNK_SIZE, MAX_BYTES, charset_from_content_type, check_content_type, read_capped
+from .http_cache import get_http_cache
+from .retry import CONNECT_TIMEOUT, get_retry_policy
+from .session import get_session_pool
+from .text import normalize_text
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,15 +29,38 @@ class LandingPageParser:
       
     Эти данные могут служить отправной точкой для последующего этапа анализа с помощью LLM.
     """
-    def __init__(self, url: str, timeout: int = 10) -> None:
+    FETCH_ERROR = "Не удалось загрузить страницу."
+    # условные запросы через дисковый кэш (parsers.http_cache)
+    USE_HTTP_CACHE = True
+    # лимиты потоковой загрузки (parsers.download): байты тела, видимый текст
+    # (None — без лимита) и допустимые Content-Type
+    MAX_BYTES = MAX_BYTES
+    MAX_TEXT_CHARS: Optional[int] = None
+    ALLOWED_CONTENT_TYPES = ALLOWED_CONTENT_TYPES
+    # частичный разбор: теги (аргументы SoupStrainer), которые нужны парсеру;
+    # None — строится всё дерево
+    PARSE_ONLY: Optional[Dict[str, Any]] = None
+
+    def __init__(
+        self,
+        url: str,
+        timeout: int = 10,
+        html: Optional[str] = None,
+        tree: Optional[Any] = None
+    ) -> None:
         """
         Инициализация парсера с указанным URL и таймаутом запроса.
 
         :param url: URL посадочной страницы.
-        :param timeout: Таймаут HTTP-запроса в секундах (по умолчанию 30).
+        :param timeout: Таймаут чтения ответа в секундах (по умолчанию 10).
+        :param html: Уже загруженный HTML страницы (тогда запрос не выполняется).
+        :param tree: Уже построенное по html дерево текущего HTML-бэкенда.
         """
         self.url: str = url
         self.timeout: int = timeout
+        self.html: Optional[str] = html
+        self.tree: Optional[Any] = tree
+        self.backend = get_html_backend()
         
     @staticmethod
     def preprocess_text(raw_text: str) -> str:
@@ -41,59 +71,127 @@ class LandingPageParser:
           - Разбиение на предложения и фильтрацию коротких/дублированных фрагментов.
           - Приведение к нижнему регистру и удаление всех числовых значений.
     
+        Реализация — parsers.text.normalize_text (скомпилированные регулярки,
+        потоковая обработка кусками, результат совпадает побайтно).
+
         :param raw_text: Исходный текст.
         :return: Предобработанный текст.
         """
-        text = raw_text.replace('\xa0', '. ')
-        text = text.replace('\n', '. ')
-        text = re.sub(r'\s+', ' ', text)
-    
-        phone_regex = r'(\+7\s*\(?\d{3}\)?[\s-]*\d{3}[\s-]*\d{2}[\s-]*\d{2}|8\s*\(?\d{3}\)?[\s-]*\d{3}[\s-]*\d{2}[\s-]*\d{2})'
-        text = re.sub(phone_regex, '', text)
-        link_regex = r'http[s]?://\S+|www\S+'
-        text = re.sub(link_regex, '', text)
-    
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        seen = set()
-        filtered_sentences = []
-        for s in sentences:
-            s_clean = s.strip()
-            if len(s_clean) < 10:
-                continue
-            if s_clean.lower() not in seen:
-                seen.add(s_clean.lower())
-                filtered_sentences.append(s_clean)
-        
-        processed_text = ' '.join(filtered_sentences).lower()
-        processed_text = re.sub(r'\b\d+(?:[.,]\d+)?\b', '', processed_text)
-        return processed_text
+        return normalize_text(raw_text)
 
     def fetch_page(self) -> Optional[str]:
         """
         Загружает HTML-код страницы по заданному URL.
 
+        Если страница уже есть в HTTP-кэше, запрос уходит условным
+        (If-None-Match/If-Modified-Since), и на 304 текст берётся с диска.
+        Тело читается потоково: не текстовые ответы отбрасываются по Content-Type,
+        чтение обрывается на MAX_BYTES байт или MAX_TEXT_CHARS символов текста.
+        Временные ошибки повторяются, недоступные хосты отсекаются сразу
+        (parsers.retry); self.timeout — таймаут чтения, соединение — CONNECT_TIMEOUT.
+
         :return: HTML-код страницы, либо None, если произошла ошибка запроса.
         """
-        headers = {
-            "User-Agent": (
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
-            ),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Connection": "keep-alive"
-        }
-        
+        cache = get_http_cache() if self.USE_HTTP_CACHE else None
+        headers = cache.conditional_headers(self.url) if cache else None
+
+        def download():
+            with get_session_pool().get(self.url, timeout=(CONNECT_TIMEOUT, self.timeout), headers=headers, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type")
+                check_content_type(content_type, self.ALLOWED_CONTENT_TYPES)
+                text, truncated = read_capped(
+                    response.iter_content(CHUNK_SIZE),
+                    charset_from_content_type(content_type),
+                    self.MAX_BYTES,
+                    self.MAX_TEXT_CHARS
+                )
+            return response, text, truncated
+
         try:
-            response = requests.get(self.url, timeout=self.timeout)
-            # response.encoding = 'utf-8'
-            response.raise_for_status()
+            response, text, truncated = get_retry_policy().call(self.url, download)
+            if truncated:
+                logger.info(f"Загрузка оборвана по лимиту: {self.url}")
             logger.info(f"Страница успешно загружена: {self.url}")
-            return response.text
+            if cache:
+                return cache.resolve(self.url, response.status_code, response.headers, text, store=not truncated)
+            return text
         except Exception as e:
             logger.error(f"Ошибка при загрузке страницы {self.url}: {e}")
             return None
         
+    async def afetch(self) -> Optional[str]:
+        """
+        Асинхронный аналог fetch_page: загружает страницу через общий AsyncFetcher,
+        который ограничивает число одновременных запросов и соединений на хост.
+
+        :return: HTML-код страницы, либо None, если произошла ошибка запроса.
+        """
+        cache = get_http_cache() if self.USE_HTTP_CACHE else None
+        # SQLite и zlib кэша — в отдельном потоке, чтобы не останавливать event loop
+        headers = await asyncio.to_thread(cache.conditional_headers, self.url) if cache else None
+        fetcher = get_async_fetcher()
+        try:
+            result = await get_retry_policy().acall(self.url, lambda: fetcher.request(
+                self.url,
+                timeout=self.timeout,
+                connect_timeout=CONNECT_TIMEOUT,
+                headers=headers,
+                max_bytes=self.MAX_BYTES,
+                max_text_chars=self.MAX_TEXT_CHARS,
+                allowed_types=self.ALLOWED_CONTENT_TYPES
+            ))
+            if result.truncated:
+                logger.info(f"Загрузка оборвана по лимиту: {self.url}")
+            logger.info(f"Страница успешно загружена: {self.url}")
+            if cache:
+                return await asyncio.to_thread(
+                    cache.resolve, self.url, result.status, result.headers, result.text, store=not result.truncated
+                )
+            return result.text
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке страницы {self.url}: {e}")
+            return None
+
     def parse(self) -> Dict[str, Any]:
+        """
+        Загружает страницу и разбирает её (см. parse_html).
+
+        :return: Словарь с извлечёнными данными.
+        """
+        html_content = self.html if self.html is not None else self.fetch_page()
+        if not html_content:
+            return {"error": self.FETCH_ERROR}
+        return self.parse_html(html_content)
+
+    async def aparse(self) -> Dict[str, Any]:
+        """
+        Асинхронный аналог parse: загрузка через afetch, разбор тот же.
+
+        :return: Словарь с извлечёнными данными.
+        """
+        html_content = self.html if self.html is not None else await self.afetch()
+        if not html_content:
+            return {"error": self.FETCH_ERROR}
+        return self.parse_html(html_content)
+
+    def make_tree(self, html_content: str) -> Any:
+        """
+        Строит дерево страницы выбранным HTML-бэкендом (parsers.backends),
+        переиспользуя переданное в конструктор, если оно построено по тому же HTML.
+        """
+        if self.tree is not None and html_content is self.html:
+            return self.tree
+        return self.backend.parse(self.trim_html(html_content), only=self.PARSE_ONLY)
+
+    def trim_html(self, html_content: str) -> str:
+        """
+        Отрезает часть документа, которая парсеру заведомо не нужна,
+        чтобы не токенизировать её. По умолчанию документ не меняется.
+        """
+        return html_content
+
+    def parse_html(self, html_content: str) -> Dict[str, Any]:
         """
         Производит парсинг загруженной страницы и извлекает ключевые аспекты:
           - title: Заголовок страницы.
@@ -102,51 +200,23 @@ class LandingPageParser:
           - headings: Список заголовков (h1-h6).
           - paragraphs: Список параграфов.
           - full_text: Полный текст страницы.
+          - main_text: Основное содержимое без меню, шапки и подвала
+            (оценка плотности текста, parsers.density).
 
+        :param html_content: HTML-код страницы.
         :return: Словарь с извлечёнными данными.
         """
-        html_content = self.fetch_page()
-        if not html_content:
-            return {"error": "Не удалось загрузить страницу."}
-
-        soup = BeautifulSoup(html_content, 'html.parser')
+        extracted = self.backend.extract_page(self.make_tree(html_content))
         result: Dict[str, Any] = {
             'url': self.url,
-            'title': None,
-            'meta_description': None,
-            'meta_keywords': None,
-            'headings': [],
-            'paragraphs': [],
-            'full_text': None
+            'title': extracted['title'],
+            'meta_description': extracted['meta_description'],
+            'meta_keywords': extracted['meta_keywords'],
+            'headings': extracted['headings'],
+            'paragraphs': extracted['paragraphs'],
+            'full_text': self.preprocess_text(extracted['text']),
+            'main_text': main_content(extracted['blocks'])
         }
 
-        if soup.title:
-            result['title'] = soup.title.get_text(strip=True)
-
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            result['meta_description'] = meta_desc.get('content').strip()
-
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords and meta_keywords.get('content'):
-            result['meta_keywords'] = meta_keywords.get('content').strip()
-
-        headings: List[str] = []
-        for tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            for heading in soup.find_all(tag):
-                text = heading.get_text(separator=' ', strip=True)
-                if text:
-                    headings.append(text)
-        result['headings'] = headings
-
-        paragraphs: List[str] = []
-        for p in soup.find_all('p'):
-            text = p.get_text(separator=' ', strip=True)
-            if text:
-                paragraphs.append(text)
-        result['paragraphs'] = paragraphs
-
-        result['full_text'] = self.preprocess_text(soup.get_text(separator='\n', strip=True))
-
         logger.info("Парсинг завершён успешно.")
         return result
\ No newline at end of file
@@ -0,0 +1,168 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse, urlunparse
+
+import aiohttp
+import requests
+
+from .aio import get_async_fetcher
+from .retry import CircuitOpenError, get_retry_policy
+from .session import get_session_pool
+from .store import Shared, SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# рекламные и аналитические метки: на содержимое страницы не влияют
+TRACKING_PARAMS = frozenset((
+    "yclid", "gclid", "fbclid", "ysclid", "_openstat", "erid",
+    "roistat", "mc_cid", "mc_eid",
+))
+TRACKING_PREFIXES = ("utm_", "pm_")
+
+SHORTENER_HOSTS = frozenset((
+    "clck.ru", "ya.cc", "vk.cc", "goo.su", "bit.ly", "tinyurl.com",
+    "cutt.ly", "t.co", "is.gd", "rebrand.ly",
+))
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize(url: str) -> str:
+    """
+    Приводит URL к каноническому виду для ключа дедупликации:
+      - схема и хост в нижнем регистре, без порта по умолчанию;
+      - без фрагмента (#...) и трекинговых параметров (utm_*, yclid, ...),
+        остальные параметры остаются как есть, в исходном порядке;
+      - пустой путь заменяется на '/'.
+    https://Site.ru:443?utm_source=x&id=5#top → https://site.ru/?id=5
+    Адрес с некорректным портом возвращается как есть (без пробелов по краям).
+    """
+    url = url.strip()
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    try:
+        port = parsed.port
+    except ValueError:
+        return url
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    netloc = host
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    query = "&".join(
+        pair for pair in parsed.query.split("&")
+        if pair and not is_tracking_param(unquote(pair.split("=", 1)[0]))
+    )
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, query, ""))
+
+
+def is_shortener(url: str) -> bool:
+    return (urlparse(url).hostname or "").lower() in SHORTENER_HOSTS
+
+
+class RedirectCache(SQLiteStore):
+    """
+    Постоянный кэш «короткая ссылка → конечный адрес» в SQLite.
+    Каждая короткая ссылка раскрывается по сети один раз за TTL секунд.
+    """
+    DEFAULT_PATH = os.path.join(".cache", "redirects.sqlite")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS redirects ("
+        "url TEXT PRIMARY KEY, target TEXT NOT NULL, resolved_at REAL NOT NULL)",
+    )
+    TTL = 30 * 24 * 3600
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None) -> None:
+        super().__init__(path)
+        self.ttl = ttl or self.TTL
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT target, resolved_at FROM redirects WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def set(self, url: str, target: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO redirects (url, target, resolved_at) VALUES (?, ?, ?)",
+                (url, target, time.time())
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM redirects")
+
+
+_cache: Shared[RedirectCache] = Shared(RedirectCache)
+
+
+def get_redirect_cache() -> RedirectCache:
+    """Возвращает общий для процесса кэш редиректов, открывая его при первом обращении."""
+    return _cache.get()
+
+
+def configure_redirect_cache(**kwargs) -> RedirectCache:
+    """Открывает общий кэш редиректов с другими настройками (см. RedirectCache)."""
+    return _cache.configure(**kwargs)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Канонический адрес страницы: короткие ссылки раскрываются (один раз, с кэшем),
+    затем адрес нормализуется (см. canonicalize). Если раскрыть ссылку не удалось
+    (сеть, 4xx/5xx самого сокращателя), возвращается нормализованная короткая
+    ссылка, а в кэш ничего не пишется. Ошибка конечной страницы после редиректа
+    не мешает: её адрес известен и сохраняется.
+    """
+    url = canonicalize(url)
+    if not is_shortener(url):
+        return url
+    cache = get_redirect_cache()
+    target = cache.get(url)
+    if target is None:
+        try:
+            target = canonicalize(get_retry_policy().call(url, lambda: get_session_pool().final_url(url)))
+        except (requests.RequestException, CircuitOpenError) as e:
+            logger.warning(f"Не удалось раскрыть {url}: {e}")
+            return url
+        cache.set(url, target)
+    return target
+
+
+async def acanonical_url(url: str) -> str:
+    """Асинхронный аналог canonical_url: кэш редиректов (SQLite) читается и пишется в отдельном потоке."""
+    url = canonicalize(url)
+    if not is_shortener(url):
+        return url
+    cache = get_redirect_cache()
+    target = await asyncio.to_thread(cache.get, url)
+    if target is None:
+        try:
+            target = canonicalize(await get_retry_policy().acall(url, lambda: get_async_fetcher().final_url(url)))
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError) as e:
+            logger.warning(f"Не удалось раскрыть {url}: {e}")
+            return url
+        await asyncio.to_thread(cache.set, url, target)
+    return target
+
+
+def group_by_canonical(canonical: List[str]) -> Dict[str, List[int]]:
+    """
+    :param canonical: Канонические адреса входных строк.
+    :return: {канонический адрес: индексы строк} в порядке первого появления.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, key in enumerate(canonical):
+        groups.setdefault(key, []).append(i)
+    return groups
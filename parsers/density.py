@@ -0,0 +1,118 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from .extract import HEADING_TAGS, TextBlock
+
+# class/id/role служебных блоков: меню, шапки, подвалы, баннеры cookie и т.п.
+BOILERPLATE_HINT_RE = re.compile(
+    r'nav|menu|header|footer|sidebar|breadcrumb|cookie|social|share|copyright|'
+    r'subscribe|modal|popup|banner|widget|comment|related|pagination|login|search'
+)
+# Маркеры основного содержимого перевешивают служебные подсказки.
+CONTENT_HINT_RE = re.compile(r'content|article|main|post|text|body|description|offer|product')
+
+MIN_WORDS = 10
+SHORT_WORDS = 3
+MAX_LINK_DENSITY = 0.33
+MAX_MAIN_CHARS = 6000
+
+# Поля, которые LLM не нужны вовсе: служебные или не сериализуемые в JSON.
+SERVICE_FIELDS = ('error', 'parsed_at', 'canonical_url')
+
+
+def _is_boilerplate(block: TextBlock) -> bool:
+    if block.boilerplate:
+        return True
+    hint = block.attrs
+    return bool(hint) and BOILERPLATE_HINT_RE.search(hint) is not None and not CONTENT_HINT_RE.search(hint)
+
+
+def classify_blocks(blocks: List[TextBlock]) -> List[bool]:
+    """
+    Отмечает блоки основного содержимого по плотности текста (в духе boilerpipe):
+      - блок из служебной области (nav/header/footer/aside, class="menu" и т.п.) — обвязка;
+      - текст преимущественно из ссылок (доля > MAX_LINK_DENSITY) — обвязка;
+      - блок из MIN_WORDS и более слов — содержимое;
+      - короткий блок (SHORT_WORDS+ слов) — содержимое, если соседствует с содержимым.
+
+    :return: Признак «основное содержимое» для каждого блока.
+    """
+    words = [len(block.text.split()) for block in blocks]
+    candidate = []
+    for block, count in zip(blocks, words):
+        chars = sum(len(part) for part in block.parts)
+        link_density = block.link_chars / chars if chars else 1.0
+        candidate.append(not _is_boilerplate(block) and link_density <= MAX_LINK_DENSITY)
+
+    keep = [ok and count >= MIN_WORDS for ok, count in zip(candidate, words)]
+    for i, (ok, count) in enumerate(zip(candidate, words)):
+        if ok and not keep[i] and count >= SHORT_WORDS:
+            prev_kept = i > 0 and keep[i - 1]
+            next_kept = i + 1 < len(keep) and keep[i + 1]
+            keep[i] = prev_kept or next_kept
+    return keep
+
+
+def main_content(blocks: List[TextBlock], max_chars: Optional[int] = MAX_MAIN_CHARS) -> str:
+    """
+    Основной текст страницы: блоки содержимого (см. classify_blocks) в порядке
+    документа, без повторов, не длиннее max_chars (по границе блока).
+    Заголовки не включаются — они и так есть в поле headings.
+
+    :return: Текст или пустая строка, если содержательных блоков не нашлось.
+    """
+    seen = set()
+    kept: List[str] = []
+    total = 0
+    for block, keep in zip(blocks, classify_blocks(blocks)):
+        if not keep or block.tag in HEADING_TAGS:
+            continue
+        text = block.text
+        key = text.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if max_chars is not None and kept and total + len(text) > max_chars:
+            break
+        kept.append(text)
+        total += len(text) + 1
+    return '\n'.join(kept)
+
+
+def _unique(items: Iterable[str], skip: Iterable[str] = ()) -> List[str]:
+    seen = {s.strip().lower() for s in skip if s}
+    result = []
+    for item in items:
+        key = item.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            result.append(item.strip())
+    return result
+
+
+def compact_page(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Готовит результат парсера к отправке в LLM: убирает пустые и служебные поля
+    и дубли содержимого.
+      - если есть main_text, paragraphs и full_text не передаются (они его повторяют);
+      - иначе full_text передаётся, только если нет paragraphs;
+      - заголовки без повторов и без копии title; keywords — если не копия description.
+    Результаты Telegram-парсеров проходят с той же чисткой пустых полей.
+    """
+    data = {
+        key: value for key, value in data.items()
+        if key not in SERVICE_FIELDS and value not in (None, '', [], {})
+    }
+    if data.get('main_text') or data.get('paragraphs'):
+        data.pop('full_text', None)
+    if data.get('main_text'):
+        data.pop('paragraphs', None)
+    elif data.get('paragraphs'):
+        data['paragraphs'] = _unique(data['paragraphs'])
+    if data.get('headings'):
+        data['headings'] = _unique(data['headings'], skip=[data.get('title') or ''])
+        if not data['headings']:
+            del data['headings']
+    if data.get('meta_keywords') and data['meta_keywords'] == data.get('meta_description'):
+        del data['meta_keywords']
+    return data
@@ -0,0 +1,229 @@
+import re
+import codecs
+import logging
+from typing import AsyncIterable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_CONTENT_TYPES = (
+    "text/html",
+    "application/xhtml+xml",
+    "text/plain",
+    "text/xml",
+    "application/xml",
+)
+MAX_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+DEFAULT_ENCODING = "utf-8"
+# русские сайты без объявленной кодировки почти всегда в windows-1251
+FALLBACK_ENCODING = "cp1251"
+# где ищем <meta charset> и сколько байт отдаём детектору
+SNIFF_BYTES = 4 * 1024
+DETECT_BYTES = 32 * 1024
+
+_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# грубая оценка видимого текста: без <script>/<style> и тегов
+_NON_TEXT_RE = re.compile(r"<script.*?</script\s*>|<style.*?</style\s*>|<[^>]*>", re.IGNORECASE | re.DOTALL)
+
+
+class UnsupportedContentType(Exception):
+    """Ответ не является текстовой страницей (картинка, архив, JS-бандл и т.п.)."""
+    pass
+
+
+def check_content_type(content_type: Optional[str], allowed: Tuple[str, ...] = ALLOWED_CONTENT_TYPES) -> None:
+    """
+    :param content_type: Значение заголовка Content-Type (None, если его нет — пропускаем).
+    :param allowed: Допустимые MIME-типы.
+    :raises UnsupportedContentType: если тип не из списка.
+    """
+    if not content_type:
+        return
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if mime not in allowed:
+        raise UnsupportedContentType(f"Content-Type {mime} не поддерживается")
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    match = _CHARSET_RE.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Угадывает кодировку по образцу байт (не по всему телу).
+    Валидный UTF-8 (и чистый ASCII) распознаётся сразу; иначе — charset_normalizer,
+    если он установлен (приходит вместе с requests), иначе FALLBACK_ENCODING.
+    """
+    try:
+        # final=False: обрезанный на границе образца многобайтовый символ — не ошибка
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return DEFAULT_ENCODING
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return FALLBACK_ENCODING
+    best = from_bytes(sample).best()
+    return best.encoding if best is not None else FALLBACK_ENCODING
+
+
+def sniff_encoding(head: bytes, final: bool = False) -> Optional[str]:
+    """
+    Выбирает кодировку по началу тела, когда в заголовках её нет:
+    BOM, затем <meta charset> в первых SNIFF_BYTES, затем detect_encoding
+    по первым DETECT_BYTES.
+
+    :param head: Прочитанное начало тела.
+    :param final: Тело закончилось (больше байт не будет).
+    :return: Кодировка или None, если для решения нужно больше байт.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = _META_CHARSET_RE.search(head, 0, SNIFF_BYTES)
+    if match:
+        return match.group(1).decode("ascii")
+    if len(head) < DETECT_BYTES and not final:
+        return None
+    return detect_encoding(head[:DETECT_BYTES])
+
+
+class StreamDecoder:
+    """
+    Инкрементально декодирует тело ответа по мере чтения и говорит, когда хватит:
+      - encoding: кодировка из заголовка Content-Type; если её нет, начало тела
+        придерживается до выбора кодировки (см. sniff_encoding);
+      - max_bytes: предел прочитанных байт;
+      - max_text_chars: предел видимого текста (без тегов и скриптов);
+        None — читать до max_bytes.
+    Каждый байт декодируется ровно один раз, повторного декодирования нет.
+    """
+    def __init__(
+        self,
+        encoding: Optional[str] = None,
+        max_bytes: int = MAX_BYTES,
+        max_text_chars: Optional[int] = None
+    ) -> None:
+        self.encoding: Optional[str] = None
+        self._decoder: Optional[codecs.IncrementalDecoder] = None
+        self._head = b""
+        if encoding:
+            self._set_encoding(encoding)
+        self.max_bytes = max_bytes
+        self.max_text_chars = max_text_chars
+        self.bytes_read = 0
+        self.text_chars = 0
+        self.truncated = False
+        self._parts = []
+        self._tail = ""
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Принимает очередной кусок тела.
+
+        :return: True, если читать дальше; False — лимит достигнут.
+        """
+        room = self.max_bytes - self.bytes_read
+        if len(chunk) > room:
+            chunk = chunk[:room]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        if self._decoder is None:
+            self._head += chunk
+            encoding = sniff_encoding(self._head)
+            if encoding is None:
+                return not self.truncated
+            self._set_encoding(encoding)
+            chunk, self._head = self._head, b""
+        self._consume(self._decoder.decode(chunk))
+        return not self.truncated
+
+    def _set_encoding(self, encoding: str) -> None:
+        try:
+            decoder_cls = codecs.getincrementaldecoder(encoding)
+        except LookupError:
+            logger.warning(f"Неизвестная кодировка {encoding}, используется {DEFAULT_ENCODING}")
+            encoding = DEFAULT_ENCODING
+            decoder_cls = codecs.getincrementaldecoder(encoding)
+        self.encoding = encoding
+        self._decoder = decoder_cls(errors="replace")
+
+    def _consume(self, text: str) -> None:
+        self._parts.append(text)
+        if self.max_text_chars is not None:
+            scan, self._tail = _split_open_markup(self._tail + text)
+            self.text_chars += len(_NON_TEXT_RE.sub("", scan).strip())
+            if self.text_chars >= self.max_text_chars:
+                self.truncated = True
+
+    def result(self) -> str:
+        if self._decoder is None:
+            # тело кончилось раньше DETECT_BYTES: решаем по тому, что есть
+            self._set_encoding(sniff_encoding(self._head, final=True))
+            self._parts.append(self._decoder.decode(self._head, final=True))
+            self._head = b""
+        else:
+            self._parts.append(self._decoder.decode(b"", final=True))
+        return "".join(self._parts)
+
+
+def _split_open_markup(text: str) -> Tuple[str, str]:
+    """Отделяет хвост с незакрытым тегом, <script> или <style>: его оценим со следующим куском."""
+    lower = text.lower()
+    cut = len(text)
+    for open_tag, close_tag in (("<script", "</script"), ("<style", "</style")):
+        start = lower.rfind(open_tag)
+        if start != -1 and lower.find(close_tag, start) == -1:
+            cut = min(cut, start)
+    lt = text.rfind("<", 0, cut)
+    if lt != -1 and text.find(">", lt, cut) == -1:
+        cut = lt
+    return text[:cut], text[cut:]
+
+
+def decode_body(body: bytes, content_type: Optional[str] = None) -> str:
+    """Декодирует уже полностью загруженное тело тем же порядком выбора кодировки, что и StreamDecoder."""
+    decoder = StreamDecoder(charset_from_content_type(content_type), max_bytes=len(body))
+    if body:
+        decoder.feed(body)
+    return decoder.result()
+
+
+def read_capped(
+    chunks: Iterable[bytes],
+    encoding: Optional[str] = None,
+    max_bytes: int = MAX_BYTES,
+    max_text_chars: Optional[int] = None
+) -> Tuple[str, bool]:
+    """
+    Читает поток байт до лимита (см. StreamDecoder).
+
+    :return: (текст, был ли поток оборван по лимиту).
+    """
+    decoder = StreamDecoder(encoding, max_bytes, max_text_chars)
+    for chunk in chunks:
+        if chunk and not decoder.feed(chunk):
+            break
+    return decoder.result(), decoder.truncated
+
+
+async def aread_capped(
+    chunks: AsyncIterable[bytes],
+    encoding: Optional[str] = None,
+    max_bytes: int = MAX_BYTES,
+    max_text_chars: Optional[int] = None
+) -> Tuple[str, bool]:
+    """Асинхронный аналог read_capped."""
+    decoder = StreamDecoder(encoding, max_bytes, max_text_chars)
+    async for chunk in chunks:
+        if chunk and not decoder.feed(chunk):
+            break
+    return decoder.result(), decoder.truncated
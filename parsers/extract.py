@@ -0,0 +1,245 @@
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Строки, которые учитывает Tag.get_text(): без комментариев, doctype,
+# содержимого <script>/<style>/<template> и т.п. (у них свои подклассы NavigableString).
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+# Теги, текст внутри которых BeautifulSoup не отдаёт в get_text().
+NON_TEXT_TAGS = ('script', 'style', 'template', 'rt', 'rp')
+
+# Блочные теги: текст внутри них — отдельный блок для оценки плотности (parsers.density).
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'body', 'dd', 'details', 'dialog', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'header', 'li', 'main', 'menu', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+) + HEADING_TAGS)
+# Теги внутри <title>: HTML5-парсеры (lxml, lexbor) оставляют их текстом.
+MARKUP_RE = re.compile(r"</?[a-zA-Z][^<>]*>")
+
+# Служебные области страницы: их блоки помечаются как обвязка вместе со всеми вложенными.
+BOILERPLATE_TAGS = frozenset(('nav', 'header', 'footer', 'aside', 'form', 'menu', 'dialog'))
+# Теги, открытие которых по HTML5 неявно закрывает открытый <p>. lxml и lexbor
+# закрывают его сами, html.parser вкладывает тег в параграф — сборщик
+# выравнивает результат, переставая копить текст в такой параграф.
+CLOSES_P_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'details', 'dialog', 'dir', 'div',
+    'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'header', 'hgroup', 'hr',
+    'li', 'listing', 'main', 'menu', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'ul', 'xmp',
+) + HEADING_TAGS)
+
+
+class TextBlock:
+    """Текст одного блочного тега (без вложенных блоков) и доля текста в ссылках."""
+    __slots__ = ('tag', 'attrs', 'boilerplate', 'parts', 'link_chars')
+
+    def __init__(self, tag: str, attrs: str, boilerplate: bool) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.boilerplate = boilerplate
+        self.parts: List[str] = []
+        self.link_chars = 0
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.parts)
+
+
+class _PageCollector:
+    """
+    Собирает поля страницы по мере обхода дерева: строки текста сразу
+    раздаются всем открытым в данный момент заголовкам, параграфам и <title>,
+    а также самому вложенному открытому блоку (TextBlock).
+    """
+    def __init__(self) -> None:
+        self.title: Optional[List[str]] = None
+        self.meta: Dict[str, Any] = {}
+        self.headings: Dict[str, List[List[str]]] = {name: [] for name in HEADING_TAGS}
+        self.paragraphs: List[List[str]] = []
+        self.text: List[str] = []
+        self.active: List[List[str]] = []
+        self.blocks: List[TextBlock] = []
+        self.block_stack: List[TextBlock] = []
+        self.link_depth = 0
+        # открытые <p>, ещё собирающие текст (см. CLOSES_P_TAGS)
+        self.open_paragraphs: List[List[str]] = []
+        # на каждый открытый тег: (имя, сборщик текста, блок ли, ссылка ли)
+        self.frames: List[tuple] = []
+
+    def open_tag(self, name: str, get_attr: Callable[[str], Any]) -> bool:
+        """Регистрирует тег; возвращает True, если для него нужно вызвать close_tag."""
+        if name in CLOSES_P_TAGS and self.open_paragraphs:
+            for parts in self.open_paragraphs:
+                self._stop_collecting(parts)
+            self.open_paragraphs = []
+        if name in self.headings and self.frames and self.frames[-1][0] in self.headings:
+            # заголовок прямо внутри заголовка: HTML5 закрывает внешний
+            self._stop_collecting(self.frames[-1][1])
+
+        block = link = False
+        if name in BLOCK_TAGS:
+            parent = self.block_stack[-1] if self.block_stack else None
+            attrs = _attrs_hint(get_attr)
+            boilerplate = name in BOILERPLATE_TAGS or (parent is not None and parent.boilerplate)
+            current = TextBlock(name, attrs, boilerplate)
+            self.blocks.append(current)
+            self.block_stack.append(current)
+            block = True
+        elif name == 'a':
+            self.link_depth += 1
+            link = True
+
+        parts = None
+        if name in self.headings:
+            parts = []
+            self.headings[name].append(parts)
+        elif name == 'p':
+            parts = []
+            self.paragraphs.append(parts)
+            self.open_paragraphs.append(parts)
+        elif name == 'title' and self.title is None:
+            parts = self.title = []
+        elif name == 'meta':
+            meta_name = get_attr('name')
+            if meta_name in ('description', 'keywords') and meta_name not in self.meta:
+                self.meta[meta_name] = get_attr('content')
+        if parts is not None:
+            self.active.append(parts)
+        self.frames.append((name, parts, block, link))
+        return True
+
+    def close_tag(self) -> None:
+        _, parts, block, link = self.frames.pop()
+        if parts is not None:
+            self._stop_collecting(parts)
+            if self.open_paragraphs and self.open_paragraphs[-1] is parts:
+                self.open_paragraphs.pop()
+        if block:
+            self.block_stack.pop()
+        if link:
+            self.link_depth -= 1
+
+    def _stop_collecting(self, parts: Optional[List[str]]) -> None:
+        # по идентичности: у двух сборщиков может оказаться одинаковый текст
+        for i in range(len(self.active) - 1, -1, -1):
+            if self.active[i] is parts:
+                del self.active[i]
+                return
+
+    def add_text(self, value: str) -> None:
+        if self.frames and self.frames[-1][0] == 'title':
+            # в <title> только текст: разметку, оставленную парсером строкой, выбрасываем
+            value = MARKUP_RE.sub('', value)
+        stripped = value.strip()
+        if stripped:
+            self.text.append(stripped)
+            for parts in self.active:
+                parts.append(stripped)
+            if self.block_stack:
+                current = self.block_stack[-1]
+                current.parts.append(stripped)
+                if self.link_depth:
+                    current.link_chars += len(stripped)
+
+    def result(self) -> Dict[str, Any]:
+        # порядок как у find_all по уровням: сначала все h1, затем все h2 и т.д.
+        heading_texts = [' '.join(parts) for name in HEADING_TAGS for parts in self.headings[name]]
+        paragraph_texts = [' '.join(parts) for parts in self.paragraphs]
+        meta = self.meta
+
+        return {
+            'title': ''.join(self.title) if self.title is not None else None,
+            'meta_description': meta['description'].strip() if meta.get('description') else None,
+            'meta_keywords': meta['keywords'].strip() if meta.get('keywords') else None,
+            'headings': [t for t in heading_texts if t],
+            'paragraphs': [t for t in paragraph_texts if t],
+            'text': '\n'.join(self.text),
+            'blocks': [block for block in self.blocks if block.parts],
+        }
+
+
+def _attrs_hint(get_attr: Callable[[str], Any]) -> str:
+    # class у BeautifulSoup — список, у selectolax — строка
+    values = []
+    for name in ('class', 'id', 'role'):
+        value = get_attr(name)
+        if value:
+            values.append(' '.join(value) if isinstance(value, list) else value)
+    return ' '.join(values).lower()
+
+
+def extract_page(soup: BeautifulSoup) -> Dict[str, Any]:
+    """
+    Извлекает данные посадочной страницы за один обход дерева.
+
+    Результат совпадает с последовательными вызовами
+    soup.title / find('meta', ...) / find_all('h1'..'h6') / find_all('p') / get_text,
+    но каждый узел посещается один раз. На невалидной разметке title, headings
+    и paragraphs приводятся к разбору HTML5 (как у lxml и lexbor): неявно
+    закрытые <p> и <h*> не вбирают текст следующих тегов, а теги внутри <title>
+    отбрасываются, и его текст идёт одной строкой. blocks и построенный по ним
+    main_text могут отличаться между бэкендами: html.parser не выносит текст
+    из неявно закрытого <p> (см. tests/test_backends.py).
+
+    :param soup: Дерево страницы.
+    :return: Словарь с ключами title, meta_description, meta_keywords,
+             headings, paragraphs, text (текст страницы до preprocess_text)
+             и blocks (TextBlock в порядке документа, см. parsers.density).
+    """
+    collector = _PageCollector()
+    stack = [(iter(soup.contents), None)]
+    while stack:
+        children, opened = stack[-1]
+        node = next(children, None)
+        if node is None:
+            stack.pop()
+            if opened:
+                collector.close_tag()
+            continue
+
+        if isinstance(node, Tag):
+            children = node.contents
+            if node.name == 'title' and node.find(True) is not None:
+                # html.parser разбирает разметку внутри <title> на теги: берём
+                # текст целиком, одной строкой, как у HTML5-парсеров (lxml, lexbor)
+                children = [NavigableString(node.get_text())]
+            stack.append((iter(children), collector.open_tag(node.name, node.get)))
+        elif type(node) in TEXT_STRING_TYPES:
+            collector.add_text(node)
+
+    return collector.result()
+
+
+def extract_page_lexbor(root: Any) -> Dict[str, Any]:
+    """
+    То же, что extract_page, для дерева selectolax (LexborNode).
+
+    :param root: Корневой узел документа (LexborHTMLParser.root).
+    :return: Словарь того же вида, что у extract_page.
+    """
+    collector = _PageCollector()
+    if root is None:
+        return collector.result()
+
+    # (следующий узел на этом уровне, открыт ли сборщик у родителя)
+    stack = [(root.child, collector.open_tag(root.tag, root.attributes.get))]
+    while stack:
+        node, opened = stack[-1]
+        if node is None:
+            stack.pop()
+            if opened:
+                collector.close_tag()
+            continue
+        stack[-1] = (node.next, opened)
+
+        tag = node.tag
+        if tag == '-text':
+            collector.add_text(node.text_content or '')
+        elif not tag.startswith('-') and tag not in NON_TEXT_TAGS:
+            stack.append((node.child, collector.open_tag(tag, node.attributes.get)))
+
+    return collector.result()
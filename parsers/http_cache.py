@@ -0,0 +1,135 @@
+import os
+import time
+import zlib
+import logging
+from typing import Dict, Mapping, Optional
+
+from .store import Shared, SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache(SQLiteStore):
+    """
+    Дисковый кэш HTTP-ответов для условных GET-запросов.
+
+    Хранит тело страницы (сжатое zlib) вместе с ETag/Last-Modified.
+    При повторной загрузке сервер получает If-None-Match/If-Modified-Since,
+    и на ответ 304 тело берётся с диска — по сети идут только изменившиеся страницы.
+      - max_bytes: предел суммарного размера сжатых тел; сверх него
+        вытесняются давно не использованные записи (LRU).
+    Счётчики hits/misses/updates доступны через stats().
+    """
+    DEFAULT_PATH = os.path.join(".cache", "http_cache.sqlite")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL, "
+        "size INTEGER NOT NULL, accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)",
+    )
+    MAX_BYTES = 512 * 1024 * 1024
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        super().__init__(path)
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        :param url: Адрес страницы.
+        :return: Заголовки условного запроса для сохранённой копии (пустые, если копии нет).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def resolve(self, url: str, status: int, headers: Mapping[str, str], text: str, store: bool = True) -> str:
+        """
+        Обрабатывает ответ на (возможно условный) запрос.
+
+        :param url: Адрес страницы.
+        :param status: HTTP-статус ответа.
+        :param headers: Заголовки ответа.
+        :param text: Тело ответа (пустое для 304).
+        :param store: False — не сохранять тело (например, обрезанное по лимиту).
+        :return: Актуальный текст страницы: из кэша для 304, иначе text.
+        """
+        if status == 304:
+            cached = self._load(url)
+            if cached is not None:
+                return cached
+            logger.warning(f"304 без сохранённой копии: {url}")
+            return text
+
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with self._lock:
+            known = self._conn.execute("SELECT 1 FROM responses WHERE url = ?", (url,)).fetchone()
+            if known:
+                self.updates += 1
+            else:
+                self.misses += 1
+        if store and status == 200 and (etag or last_modified):
+            self._store(url, etag, last_modified, text)
+        return text
+
+    def _load(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def _store(self, url: str, etag: Optional[str], last_modified: Optional[str], text: str) -> None:
+        body = zlib.compress(text.encode("utf-8"), 6)
+        with self._lock:
+            replaced = self._stored_size("responses", "url", url)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, len(body), time.time())
+            )
+            self._evict_lru("responses", "url", self.max_bytes, len(body) - replaced)
+
+    def stats(self) -> Dict[str, float]:
+        """Счётчики кэша: hits (ответ 304 отдан с диска), misses (новый URL), updates (страница изменилась)."""
+        requests_total = self.hits + self.misses + self.updates
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "updates": self.updates,
+            "hit_rate": self.hits / requests_total if requests_total else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._lru_bytes.pop("responses", None)
+            self.hits = self.misses = self.updates = 0
+
+
+_cache: Shared[HttpCache] = Shared(HttpCache)
+
+
+def get_http_cache() -> HttpCache:
+    """Возвращает общий для процесса HTTP-кэш, открывая его при первом обращении."""
+    return _cache.get()
+
+
+def configure_http_cache(**kwargs) -> HttpCache:
+    """Открывает общий HTTP-кэш с другими настройками (см. HttpCache)."""
+    return _cache.configure(**kwargs)
@@ -0,0 +1,228 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+import requests
+
+from .store import Shared
+from .throttle import BACKOFF_STATUSES, host_of
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# раздельные таймауты: соединение с мёртвым хостом обрывается быстро,
+# а медленная, но живая страница успевает отдать тело
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+
+class CircuitOpenError(Exception):
+    """Хост временно исключён: несколько запросов подряд к нему не прошли."""
+    pass
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """Ответ 429: хост жив, но просит притормозить."""
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code == 429
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429
+    return False
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Стоит ли повторять запрос после этой ошибки: обрыв соединения, таймаут,
+    429 или 5xx. Ошибки 4xx, не текстовый Content-Type и т.п. не повторяются.
+    """
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in BACKOFF_STATUSES
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in BACKOFF_STATUSES
+    return isinstance(exc, (
+        requests.ConnectionError,
+        requests.Timeout,
+        aiohttp.ClientConnectionError,
+        aiohttp.ClientPayloadError,
+        asyncio.TimeoutError,
+    ))
+
+
+class _Circuit:
+    def __init__(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial = False
+
+
+class RetryPolicy:
+    """
+    Повторы с джиттером и circuit breaker на каждый хост, общие для всех парсеров.
+
+      - ATTEMPTS: сколько всего попыток на запрос при временных ошибках;
+      - BACKOFF / MAX_BACKOFF: экспоненциальная пауза между попытками
+        (full jitter: случайная от 0 до BACKOFF * 2^n);
+      - FAILURE_THRESHOLD: после стольких неудачных запросов подряд (каждый —
+        после всех своих повторов; 429 не считается) хост «открывается» —
+        запросы к нему сразу падают с CircuitOpenError, без ожидания таймаута;
+      - RESET_TIMEOUT: через сколько секунд пропустить к открытому хосту один
+        пробный запрос (half-open). Успех закрывает цепь, неудача снова открывает.
+    """
+    ATTEMPTS = 3
+    BACKOFF = 0.5
+    MAX_BACKOFF = 8.0
+    FAILURE_THRESHOLD = 3
+    RESET_TIMEOUT = 60.0
+
+    def __init__(
+        self,
+        attempts: Optional[int] = None,
+        backoff: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None
+    ) -> None:
+        self.attempts = attempts or self.ATTEMPTS
+        self.backoff = backoff if backoff is not None else self.BACKOFF
+        self.failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or self.RESET_TIMEOUT
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def before(self, host: str, trial: bool = False) -> bool:
+        """
+        Проверяет, можно ли обращаться к хосту.
+
+        :param trial: Запрос уже владеет пробной попыткой к этому хосту.
+        :return: True, если запрос пробный (half-open): его исход решит судьбу цепи.
+        :raises CircuitOpenError: если цепь хоста открыта или уже идёт чужой пробный запрос.
+        """
+        if trial:
+            return True
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or not circuit.open_until:
+                return False
+            if time.monotonic() < circuit.open_until or circuit.trial:
+                raise CircuitOpenError(f"{host} временно недоступен")
+            circuit.trial = True
+            return True
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            self._circuits.pop(host, None)
+
+    def failure(self, host: str) -> bool:
+        """
+        Учитывает неудачу запроса к хосту (один раз на запрос, после всех повторов).
+
+        :return: True, если после неё цепь хоста открыта.
+        """
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            circuit.failures += 1
+            if circuit.trial or circuit.failures >= self.failure_threshold:
+                if not circuit.trial:
+                    logger.warning(f"{host}: {circuit.failures} неудач подряд, запросы приостановлены на {self.reset_timeout:.0f}s")
+                circuit.open_until = time.monotonic() + self.reset_timeout
+                circuit.trial = False
+                return True
+            return False
+
+    def release(self, host: str) -> None:
+        """Снимает пробную попытку без исхода (запрос отменён): следующий запрос сможет стать пробным."""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None:
+                circuit.trial = False
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.MAX_BACKOFF, self.backoff * 2 ** attempt))
+
+    def _should_retry(self, exc: Exception, attempt: int, trial: bool) -> bool:
+        # пробный запрос не повторяется: его неудача сразу снова открывает цепь
+        return is_transient(exc) and not trial and attempt + 1 < self.attempts
+
+    def _settle(self, host: str, exc: Optional[Exception]) -> None:
+        """
+        Итог запроса для circuit breaker. Неудачей считаются только обрывы,
+        таймауты и 5xx; 429 — забота HostThrottle, а ответ 4xx значит, что хост жив.
+        """
+        if exc is not None and is_transient(exc) and not is_rate_limited(exc):
+            self.failure(host)
+        else:
+            self.success(host)
+
+    def call(self, url: str, func: Callable[[], T]) -> T:
+        """
+        Выполняет func() — запрос к url — с повторами и учётом состояния хоста.
+
+        :raises CircuitOpenError: если хост исключён.
+        :raises Exception: последняя ошибка func, если попытки кончились.
+        """
+        host = host_of(url)
+        attempt = 0
+        trial = settled = False
+        try:
+            while True:
+                trial = self.before(host, trial)
+                try:
+                    result = func()
+                except Exception as e:
+                    if not self._should_retry(e, attempt, trial):
+                        settled = True
+                        self._settle(host, e)
+                        raise
+                    logger.info(f"Повтор запроса {url} после ошибки: {e}")
+                    time.sleep(self.delay(attempt))
+                    attempt += 1
+                    continue
+                settled = True
+                self._settle(host, None)
+                return result
+        finally:
+            if trial and not settled:
+                self.release(host)
+
+    async def acall(self, url: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Асинхронный аналог call: func возвращает корутину запроса."""
+        host = host_of(url)
+        attempt = 0
+        trial = settled = False
+        try:
+            while True:
+                trial = self.before(host, trial)
+                try:
+                    result = await func()
+                except Exception as e:
+                    if not self._should_retry(e, attempt, trial):
+                        settled = True
+                        self._settle(host, e)
+                        raise
+                    logger.info(f"Повтор запроса {url} после ошибки: {e}")
+                    await asyncio.sleep(self.delay(attempt))
+                    attempt += 1
+                    continue
+                settled = True
+                self._settle(host, None)
+                return result
+        finally:
+            # отмена (CancelledError) не должна оставить хост с вечной пробной попыткой
+            if trial and not settled:
+                self.release(host)
+
+_policy: Shared[RetryPolicy] = Shared(RetryPolicy)
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Возвращает общую для процесса политику повторов."""
+    return _policy.get()
+
+
+def configure_retry_policy(**kwargs: Any) -> RetryPolicy:
+    """Пересоздаёт общую политику повторов с другими настройками (см. RetryPolicy)."""
+    return _policy.configure(**kwargs)
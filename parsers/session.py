@@ -0,0 +1,128 @@
+import threading
+import logging
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .store import Shared
+from .throttle import get_throttle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS: Dict[str, str] = {
+    "User-Agent": (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+
+class SessionPool:
+    """
+    Общий пул HTTP-соединений для всех парсеров.
+
+    Один requests.Session на процесс: TCP/TLS-соединения переиспользуются
+    между запросами к одному хосту, вместо нового рукопожатия на каждый URL.
+      - pool_connections: сколько хостов держим в пуле одновременно;
+      - pool_maxsize: максимум соединений на один хост;
+      - keep_alive: держать ли соединения открытыми между запросами;
+      - headers: заголовки, которые отправляются с каждым запросом.
+    """
+    POOL_CONNECTIONS = 100
+    POOL_MAXSIZE = 10
+
+    def __init__(
+        self,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        keep_alive: bool = True,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.pool_connections = pool_connections or self.POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or self.POOL_MAXSIZE
+        self.keep_alive = keep_alive
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # pool_block=True: при исчерпании соединений к хосту поток ждёт свободное,
+        # а не открывает лишнее, которое потом будет выброшено.
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self.headers)
+        session.headers["Connection"] = "keep-alive" if self.keep_alive else "close"
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET-запрос через общий пул соединений.
+        Перед запросом ждёт разрешения HostThrottle для хоста url,
+        после — сообщает ему статус ответа.
+
+        :param url: Адрес запроса.
+        :param kwargs: Параметры requests (timeout, headers, stream, ...).
+        :return: Объект ответа requests.
+        """
+        throttle = get_throttle()
+        throttle.acquire(url)
+        response = self.session.get(url, **kwargs)
+        throttle.report(url, response.status_code, response.headers.get("Retry-After"))
+        return response
+
+    def final_url(self, url: str, timeout: float = 5) -> str:
+        """
+        Проходит по редиректам и возвращает конечный адрес. Тело ответа не читается.
+        Если редирект был, адрес конечной страницы возвращается и при её ответе
+        4xx/5xx (многие сайты отвечают ботам 403/404): ссылка всё равно раскрыта.
+
+        :raises requests.RequestException: при сетевой ошибке или ответе 4xx/5xx
+            без редиректа (429 или 5xx сокращателя — не конечный адрес, а повод повторить).
+        """
+        with self.get(url, timeout=timeout, stream=True, allow_redirects=True) as response:
+            if not response.history:
+                response.raise_for_status()
+            return response.url
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_pool: Shared[SessionPool] = Shared(SessionPool, dispose=SessionPool.close)
+
+
+def get_session_pool() -> SessionPool:
+    """Возвращает общий для процесса пул соединений, создавая его при первом обращении."""
+    return _pool.get()
+
+
+def configure_session_pool(**kwargs) -> SessionPool:
+    """
+    Пересоздаёт общий пул с новыми настройками (см. SessionPool).
+    Открытые соединения старого пула закрываются.
+    """
+    pool = _pool.configure(**kwargs)
+    logger.info(
+        f"Пул соединений: {pool.pool_connections} хостов, "
+        f"{pool.pool_maxsize} соединений на хост, keep-alive={pool.keep_alive}"
+    )
+    return pool
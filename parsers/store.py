@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class SQLiteStore:
+    """
+    Основа постоянных хранилищ в .cache/: одно соединение SQLite на процесс
+    (WAL, автокоммит), общий для потоков под self._lock, и схема из SCHEMA.
+
+    Наследник задаёт DEFAULT_PATH и SCHEMA (CREATE TABLE/INDEX IF NOT EXISTS);
+    TIMEOUT — сколько секунд ждать блокировку базы, занятой другим процессом.
+    """
+    DEFAULT_PATH: str = ""
+    SCHEMA: Sequence[str] = ()
+    TIMEOUT = 5.0
+    # через сколько вставок сверять размер таблицы с базой: в неё пишут и другие процессы
+    LRU_RESYNC = 1000
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or self.DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._lru_bytes: Dict[str, int] = {}
+        self._lru_writes = 0
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=self.TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+
+    def _stored_size(self, table: str, key: str, value: Any) -> int:
+        """:return: size записи value (0, если её нет). Вызывать под self._lock."""
+        row = self._conn.execute(f"SELECT size FROM {table} WHERE {key} = ?", (value,)).fetchone()
+        return row[0] if row else 0
+
+    def _released(self, table: str, size: int) -> None:
+        """Учитывает удаление записи размером size в обход _evict_lru. Вызывать под self._lock."""
+        if table in self._lru_bytes:
+            self._lru_bytes[table] -= size
+
+    def _evict_lru(self, table: str, key: str, max_bytes: int, added: int) -> None:
+        """
+        Учитывает вставку (added — на сколько байт вырос суммарный size) и, если
+        сумма превысила max_bytes, вытесняет давно не использованные записи.
+        Сумма ведётся в памяти: SUM(size) по всей таблице считается при первой
+        вставке и раз в LRU_RESYNC вставок. У таблицы должны быть колонки size
+        и accessed_at; вызывать под self._lock.
+        """
+        self._lru_writes += 1
+        total = self._lru_bytes.get(table)
+        if total is None or self._lru_writes % self.LRU_RESYNC == 0:
+            total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        else:
+            total += added
+        while total > max_bytes:
+            rows = self._conn.execute(f"SELECT {key}, size FROM {table} ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                total = 0
+                break
+            for value, size in rows:
+                if total <= max_bytes:
+                    break
+                self._conn.execute(f"DELETE FROM {table} WHERE {key} = ?", (value,))
+                total -= size
+        self._lru_bytes[table] = total
+
+
+class Shared(Generic[T]):
+    """
+    Общий для процесса экземпляр: создаётся при первом get(), configure()
+    пересоздаёт его с другими аргументами. Основа функций get_* / configure_*.
+
+    :param dispose: Чем освободить прежний экземпляр при configure() (например, закрыть соединения).
+    """
+    def __init__(self, factory: Callable[..., T], dispose: Optional[Callable[[T], None]] = None) -> None:
+        self._factory = factory
+        self._dispose = dispose
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def configure(self, **kwargs: Any) -> T:
+        with self._lock:
+            if self._instance is not None and self._dispose is not None:
+                self._dispose(self._instance)
+            self._instance = self._factory(**kwargs)
+        return self._instance
@@ -0,0 +1,123 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Set
+
+PHONE_RE = re.compile(
+    r'(\+7\s*\(?\d{3}\)?[\s-]*\d{3}[\s-]*\d{2}[\s-]*\d{2}|8\s*\(?\d{3}\)?[\s-]*\d{3}[\s-]*\d{2}[\s-]*\d{2})'
+)
+LINK_RE = re.compile(r'http[s]?://\S+|www\S+')
+NUMBER_RE = re.compile(r'\b\d+(?:[.,]\d+)?\b')
+SENTENCE_END_RE = re.compile(r'[.!?]\s+')
+
+MIN_SENTENCE_LEN = 10
+CHUNK_SIZE = 1 << 16
+
+
+def collapse_whitespace(text: str) -> str:
+    """
+    То же, что re.sub(r'\\s+', ' ', text), но через str.split/join:
+    оба используют одно определение пробельного символа, а split работает в разы быстрее.
+    """
+    collapsed = ' '.join(text.split())
+    if not collapsed:
+        return ' ' if text else ''
+    if text[0].isspace():
+        collapsed = ' ' + collapsed
+    if text[-1].isspace():
+        collapsed += ' '
+    return collapsed
+
+
+def split_sentences(text: str) -> Iterator[str]:
+    """
+    Лениво режет текст по пробелам после '.', '!' или '?'.
+    Даёт те же части, что re.split(r'(?<=[.!?])\\s+', text), без списка в памяти.
+    """
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        yield text[start:match.start() + 1]
+        start = match.end()
+    yield text[start:]
+
+
+def unique_sentences(
+    sentences: Iterable[str],
+    min_len: int = MIN_SENTENCE_LEN,
+    seen: Optional[Set[str]] = None
+) -> Iterator[str]:
+    """
+    За один проход отбрасывает короткие (< min_len) и повторные предложения.
+    Повторы сравниваются без учёта регистра; отдаются предложения в нижнем регистре.
+
+    :param seen: Множество уже встреченных предложений (общее для нескольких вызовов).
+    """
+    if seen is None:
+        seen = set()
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if len(sentence) < min_len:
+            continue
+        key = sentence.lower()
+        if key not in seen:
+            seen.add(key)
+            yield key
+
+
+def _line_chunks(text: str, size: int) -> Iterator[str]:
+    # Режем только после '\n': он превращается в '. ' и закрывает предложение.
+    # Строку со ссылкой перед разрезом пропускаем: LINK_RE съедает и эту точку,
+    # склеивая предложение со следующей строкой.
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start + size)
+        while end != -1:
+            line = text[text.rfind('\n', start, end) + 1:end]
+            if 'http' not in line and 'www' not in line:
+                break
+            end = text.find('\n', end + 1)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+
+def iter_sentences(raw_text: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Потоково отдаёт очищенные уникальные предложения текста (в нижнем регистре, с числами).
+
+    Текст обрабатывается кусками по ~chunk_size символов, поэтому временные
+    копии имеют размер куска, а не всей страницы.
+    """
+    seen: Set[str] = set()
+    for chunk in _line_chunks(raw_text, chunk_size):
+        chunk = collapse_whitespace(chunk.replace('\xa0', '. ').replace('\n', '. '))
+        chunk = PHONE_RE.sub('', chunk)
+        if 'http' in chunk or 'www' in chunk:
+            chunk = LINK_RE.sub('', chunk)
+        yield from unique_sentences(split_sentences(chunk), seen=seen)
+
+
+def normalize_text(raw_text: str, max_chars: Optional[int] = None) -> str:
+    """
+    Предобрабатывает текст страницы (см. LandingPageParser.preprocess_text).
+
+    :param raw_text: Исходный текст.
+    :param max_chars: None — режим совместимости: результат побайтно совпадает
+                      с прежней реализацией preprocess_text. Иначе обработка
+                      останавливается, как только набрано max_chars символов;
+                      результат — начало (по границе предложения) полного.
+    :return: Предобработанный текст.
+    """
+    if max_chars is None:
+        # числа удаляются после склейки: \b на границе предложений совпадает с \b у пробела
+        return NUMBER_RE.sub('', ' '.join(iter_sentences(raw_text)))
+
+    parts: List[str] = []
+    total = 0
+    for sentence in iter_sentences(raw_text):
+        sentence = NUMBER_RE.sub('', sentence)
+        parts.append(sentence)
+        total += len(sentence) + 1
+        if total > max_chars:
+            break
+    return ' '.join(parts)
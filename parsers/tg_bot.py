@@ -1,5 +1,5 @@
 # from urlib.parse import urlparse
-from bs4 import BeautifulSoup
+from .backends import class_pattern, cut_after
 from .base import LandingPageParser
 
 class TelegramBotWebParser(LandingPageParser):
@@ -8,18 +8,24 @@ class TelegramBotWebParser(LandingPageParser):
       - title   — название бота
       - description — описание бота
     """
-    def parse(self):
-        html = self.fetch_page()
-        if not html:
-            return {"error": "Не удалось загрузить страницу бота."}
+    FETCH_ERROR = "Не удалось загрузить страницу бота."
+    PARSE_ONLY = {"name": "div", "class_": ["tgme_page_title", "tgme_page_description"]}
+    TITLE_TAG = class_pattern("tgme_page_title")
+    DESCRIPTION_TAG = class_pattern("tgme_page_description")
 
-        soup = BeautifulSoup(html, "html.parser")
+    def trim_html(self, html):
+        # описание идёт после заголовка; дальше страницу не читаем
+        return cut_after(html, self.DESCRIPTION_TAG, require=self.TITLE_TAG)
 
-        title_el = soup.select_one("div.tgme_page_title span")
-        title = title_el.get_text(strip=True) if title_el else ""
+    def parse_html(self, html):
+        tree = self.make_tree(html)
+        b = self.backend
 
-        desc_el = soup.select_one("div.tgme_page_description")
-        description = desc_el.get_text(" ", strip=True) if desc_el else ""
+        title_el = b.select_one(tree, "div.tgme_page_title span")
+        title = b.text(title_el, strip=True) if title_el else ""
+
+        desc_el = b.select_one(tree, "div.tgme_page_description")
+        description = b.text(desc_el, " ", strip=True) if desc_el else ""
 
         # channel = urlparse(self.url).path.strip("/")
 
@@ -27,4 +33,4 @@ class TelegramBotWebParser(LandingPageParser):
             # "bot": channel,
             "title": title,
             "description": description
-        }
\ No newline at end of file
+        }
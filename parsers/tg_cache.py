@@ -0,0 +1,101 @@
+import os
+import time
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+
+from .store import Shared, SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "channel"
+BOT = "bot"
+DEAD = "dead"
+
+
+# Служебные пути t.me: первый сегмент — не хэндл, а вид ссылки, ключ — вместе
+# со следующим сегментом (код сообщения, хэш приглашения, id приватного канала).
+SERVICE_ROUTES = frozenset(("m", "joinchat", "addlist", "addstickers", "addemoji", "c"))
+
+
+def normalize_handle(url: str) -> str:
+    """
+    Приводит ссылку t.me к ключу кэша: имя без /s/, '@' и регистра.
+    https://t.me/s/Koroboxmsk, telegram.me/koroboxmsk?x=1 → 'koroboxmsk'
+
+    Приглашения и служебные пути ключуются целиком, код в них регистрозависим:
+    t.me/+AbC → '+AbC', t.me/m/wkKSiQ → 'm/wkKSiQ', t.me/joinchat/AbC → 'joinchat/AbC'.
+    """
+    path = urlparse(url if "://" in url else f"https://{url}").path.strip("/")
+    if path.startswith("s/"):
+        path = path[2:]
+    parts = path.split("/")
+    if parts[0].startswith("+"):
+        return parts[0]
+    route = parts[0].lower()
+    if route in SERVICE_ROUTES and len(parts) > 1:
+        return f"{route}/{parts[1]}"
+    return route.lstrip("@")
+
+class TelegramHandleCache(SQLiteStore):
+    """
+    Постоянный кэш типа Telegram-ссылок (канал / бот / мёртвый хэндл) в SQLite.
+
+    Тип хэндла меняется редко, поэтому повторные ссылки маршрутизируются
+    в нужный парсер без пробных запросов к t.me:
+      - TTL: срок жизни записи о канале или боте в секундах;
+      - DEAD_TTL: срок жизни отрицательной записи (хэндл не отвечает).
+    """
+    DEFAULT_PATH = os.path.join(".cache", "tg_handles.sqlite")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS handles ("
+        "handle TEXT PRIMARY KEY, kind TEXT NOT NULL, checked_at REAL NOT NULL)",
+    )
+    TTL = 7 * 24 * 3600
+    DEAD_TTL = 24 * 3600
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None, dead_ttl: Optional[int] = None) -> None:
+        super().__init__(path)
+        self.ttl = ttl or self.TTL
+        self.dead_ttl = dead_ttl or self.DEAD_TTL
+
+    def get(self, handle: str) -> Optional[str]:
+        """
+        :param handle: Нормализованный хэндл (см. normalize_handle).
+        :return: CHANNEL, BOT, DEAD или None, если записи нет или она устарела.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, checked_at FROM handles WHERE handle = ?", (handle,)
+            ).fetchone()
+        if row is None:
+            return None
+        kind, checked_at = row
+        ttl = self.dead_ttl if kind == DEAD else self.ttl
+        if time.time() - checked_at > ttl:
+            return None
+        return kind
+
+    def set(self, handle: str, kind: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO handles (handle, kind, checked_at) VALUES (?, ?, ?)",
+                (handle, kind, time.time())
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM handles")
+
+
+_cache: Shared[TelegramHandleCache] = Shared(TelegramHandleCache)
+
+
+def get_handle_cache() -> TelegramHandleCache:
+    """Возвращает общий для процесса кэш хэндлов, открывая его при первом обращении."""
+    return _cache.get()
+
+
+def configure_handle_cache(**kwargs) -> TelegramHandleCache:
+    """Открывает общий кэш хэндлов с другими настройками (см. TelegramHandleCache)."""
+    return _cache.configure(**kwargs)
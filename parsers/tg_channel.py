@@ -1,5 +1,5 @@
 from urllib.parse import urlparse, parse_qs
-from bs4 import BeautifulSoup
+from .backends import head_only
 from .base import LandingPageParser
 
 class TelegramWebParser(LandingPageParser):
@@ -11,23 +11,20 @@ class TelegramWebParser(LandingPageParser):
       - description: описание канала
       - last_posts: список последних 5 сообщений, каждый с датой, текстом и ссылкой на оригинал
     """
-    def parse(self):
-        html = self.fetch_page()
-        if not html:
-            return {"error": "Не удалось загрузить страницу."}
+    def parse_html(self, html):
+        tree = self.make_tree(html)
+        b = self.backend
 
-        soup = BeautifulSoup(html, "html.parser")
+        title_tag = b.select_one(tree, ".tgme_channel_info_header")
+        title = b.text(title_tag, strip=True) if title_tag else ""
 
-        title_tag = soup.select_one(".tgme_channel_info_header")
-        title = title_tag.get_text(strip=True) if title_tag else ""
-
-        desc_tag = soup.select_one(".tgme_channel_info_description")
-        description = desc_tag.get_text(" ", strip=True) if desc_tag else ""
+        desc_tag = b.select_one(tree, ".tgme_channel_info_description")
+        description = b.text(desc_tag, " ", strip=True) if desc_tag else ""
 
         posts = []
-        for msg_div in soup.select(".tgme_widget_message")[-10:]:
-            text_tag = msg_div.select_one(".tgme_widget_message_text")
-            text = text_tag.get_text("\n", strip=True) if text_tag else ""
+        for msg_div in b.select(tree, ".tgme_widget_message")[-10:]:
+            text_tag = b.select_one(msg_div, ".tgme_widget_message_text")
+            text = b.text(text_tag, "\n", strip=True) if text_tag else ""
 
             posts.append({
                 "text": text
@@ -43,22 +40,28 @@ class TelegramWebParser(LandingPageParser):
         }
     
 class TelegramPostParser(LandingPageParser):
-    def parse(self):
-        html = self.fetch_page()
-        if not html:
-            return {"error": "Не удалось загрузить страницу."}
+    """
+    Парсер отдельного поста t.me/<channel>/<id>: все данные берутся
+    из og:*/twitter:* <meta> в <head>, тело страницы не разбирается.
+    """
+    PARSE_ONLY = {"name": "meta"}
+
+    def trim_html(self, html):
+        return head_only(html)
 
-        soup = BeautifulSoup(html, "html.parser")
+    def parse_html(self, html):
+        tree = self.make_tree(html)
+        b = self.backend
         data = {}
-        og_title = soup.find("meta", property="og:title")
-        data["title"] = og_title["content"] if og_title and og_title.has_attr("content") else None
+        og_title = b.select_one(tree, 'meta[property="og:title"]')
+        data["title"] = b.attr(og_title, "content") if og_title else None
 
-        og_desc = soup.find("meta", property="og:description")
-        data["description"] = og_desc["content"] if og_desc and og_desc.has_attr("content") else None
+        og_desc = b.select_one(tree, 'meta[property="og:description"]')
+        data["description"] = b.attr(og_desc, "content") if og_desc else None
 
-        # og_img = soup.find("meta", property="og:image")
-        # data["image"] = og_img["content"] if og_img and og_img.has_attr("content") else None
+        # og_img = b.select_one(tree, 'meta[property="og:image"]')
+        # data["image"] = b.attr(og_img, "content") if og_img else None
 
-        twitter_url = soup.find("meta", attrs={"name": "twitter:app:url:googleplay"})
-        data["url"] = twitter_url["content"] if twitter_url and twitter_url.has_attr("content") else None
+        twitter_url = b.select_one(tree, 'meta[name="twitter:app:url:googleplay"]')
+        data["url"] = b.attr(twitter_url, "content") if twitter_url else None
         return data
@@ -0,0 +1,291 @@
+import os
+import re
+import time
+import asyncio
+import itertools
+import logging
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from .base import LandingPageParser
+from .store import Shared, SQLiteStore
+from .tg_cache import normalize_handle
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramHistoryPage(LandingPageParser):
+    """
+    Одна страница ленты t.me/s/<channel>[?before=<id>]: ~20 сообщений
+    в хронологическом порядке. Каждое сообщение — id, дата, просмотры и текст.
+    """
+    FETCH_ERROR = "Не удалось загрузить ленту канала."
+    # у ленты нет валидаторов, а ?before= каждый раз другой
+    USE_HTTP_CACHE = False
+    # у сообщения несколько классов, а SoupStrainer сверяет строку class целиком
+    PARSE_ONLY = {"name": "div", "class_": re.compile(r"(?:^|\s)tgme_widget_message(?:\s|$)")}
+
+    def parse_html(self, html):
+        tree = self.make_tree(html)
+        b = self.backend
+        posts = []
+        for msg_div in b.select(tree, ".tgme_widget_message[data-post]"):
+            post_ref = b.attr(msg_div, "data-post") or ""
+            _, _, post_id = post_ref.rpartition("/")
+            if not post_id.isdigit():
+                continue
+            text_tag = b.select_one(msg_div, ".tgme_widget_message_text")
+            date_tag = b.select_one(msg_div, ".tgme_widget_message_date time")
+            views_tag = b.select_one(msg_div, ".tgme_widget_message_views")
+            posts.append({
+                "id": int(post_id),
+                "url": f"https://t.me/{post_ref}",
+                "date": b.attr(date_tag, "datetime") if date_tag else None,
+                "views": b.text(views_tag, strip=True) if views_tag else None,
+                "text": b.text(text_tag, "\n", strip=True) if text_tag else "",
+            })
+        return {"posts": posts}
+
+
+class ChannelHistoryStore(SQLiteStore):
+    """
+    Последний обработанный id сообщения для каждого канала (SQLite).
+    Повторный обход канала останавливается на этом id.
+
+    Если обход упёрся в max_pages, не дойдя до last_id, между ними остаётся
+    непройденный пробел. Тогда сохраняется курсор: before — самый старый
+    полученный id, откуда продолжить, и newest — id, который станет last_id,
+    когда пробел будет пройден.
+    """
+    DEFAULT_PATH = os.path.join(".cache", "tg_history.sqlite")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS channels ("
+        "handle TEXT PRIMARY KEY, last_id INTEGER NOT NULL, updated_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS cursors ("
+        "handle TEXT PRIMARY KEY, before INTEGER NOT NULL, newest INTEGER NOT NULL, updated_at REAL NOT NULL)",
+    )
+
+    def get(self, handle: str) -> int:
+        """:return: Последний обработанный id или 0, если канал ещё не обходили."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_id FROM channels WHERE handle = ?", (handle,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def set(self, handle: str, last_id: int) -> None:
+        """Сохраняет last_id; курсор незаконченного обхода снимается."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channels (handle, last_id, updated_at) VALUES (?, ?, ?)",
+                (handle, last_id, time.time())
+            )
+            self._conn.execute("DELETE FROM cursors WHERE handle = ?", (handle,))
+
+    def get_cursor(self, handle: str) -> Optional[Tuple[int, int]]:
+        """:return: (before, newest) незаконченного обхода или None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT before, newest FROM cursors WHERE handle = ?", (handle,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set_cursor(self, handle: str, before: int, newest: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursors (handle, before, newest, updated_at) VALUES (?, ?, ?, ?)",
+                (handle, before, newest, time.time())
+            )
+
+    def clear(self, handle: Optional[str] = None) -> None:
+        with self._lock:
+            if handle is None:
+                self._conn.execute("DELETE FROM channels")
+                self._conn.execute("DELETE FROM cursors")
+            else:
+                self._conn.execute("DELETE FROM channels WHERE handle = ?", (handle,))
+                self._conn.execute("DELETE FROM cursors WHERE handle = ?", (handle,))
+
+
+_store: Shared[ChannelHistoryStore] = Shared(ChannelHistoryStore)
+
+
+def get_history_store() -> ChannelHistoryStore:
+    """Возвращает общее для процесса хранилище позиций обхода каналов."""
+    return _store.get()
+
+
+def configure_history_store(**kwargs) -> ChannelHistoryStore:
+    """Открывает общее хранилище позиций с другими настройками (см. ChannelHistoryStore)."""
+    return _store.configure(**kwargs)
+
+
+class _Walk:
+    """Состояние прохода по ленте от before (или с верха) вниз до since."""
+    __slots__ = ("since", "before", "newest", "pages", "done", "failed")
+
+    def __init__(self, since: int, before: Optional[int] = None) -> None:
+        self.since = since
+        self.before = before
+        self.newest = since
+        self.pages = 0
+        self.done = False
+        self.failed = False
+
+
+class TelegramHistoryCrawler:
+    """
+    Инкрементальный обход истории публичного канала по страницам
+    t.me/s/<channel>?before=<id>, от новых сообщений к старым.
+
+    Посты отдаются генератором по одной странице за раз, поэтому память
+    не зависит от длины канала. Обход останавливается на последнем id
+    из прошлого запуска (ChannelHistoryStore), на начале канала или на max_pages.
+    Если повторный обход упёрся в max_pages, сохраняется курсор, и следующий
+    запуск сначала дочитывает оставшийся пробел, а затем берёт новые посты —
+    так канал с потоком больше max_pages страниц всё равно догоняется.
+    Позиция сохраняется, только если генератор дочитан до конца: при досрочном
+    выходе или ошибке загрузки посты придут в следующий раз.
+
+    :param url: Ссылка на канал (t.me/<name>, t.me/s/<name>, @name не нужен).
+    :param max_pages: Предел страниц за один обход; None — без предела.
+    :param incremental: False — игнорировать сохранённую позицию и пройти всю историю.
+    """
+    def __init__(
+        self,
+        url: str,
+        max_pages: Optional[int] = None,
+        incremental: bool = True,
+        timeout: int = 10,
+        store: Optional[ChannelHistoryStore] = None
+    ) -> None:
+        self.handle = normalize_handle(url)
+        self.max_pages = max_pages
+        self.incremental = incremental
+        self.timeout = timeout
+        self.store = store or get_history_store()
+
+    def page_url(self, before: Optional[int] = None) -> str:
+        url = f"https://t.me/s/{self.handle}"
+        return f"{url}?before={before}" if before else url
+
+    def _take(self, posts: List[Dict[str, Any]], since: int, before: Optional[int]) -> List[Dict[str, Any]]:
+        # новые → старые; страница может захватить уже отданные посты
+        return [
+            post for post in reversed(posts)
+            if post["id"] > since and (before is None or post["id"] < before)
+        ]
+
+    @staticmethod
+    def _next_before(posts: List[Dict[str, Any]], since: int, before: Optional[int]) -> Optional[int]:
+        """:return: before для следующей страницы или None, если обход дошёл до since или до начала канала."""
+        if not posts:
+            return None
+        oldest = posts[0]["id"]
+        if oldest <= since + 1 or (before is not None and oldest >= before):
+            return None
+        return oldest
+
+    def _pages(self) -> Iterator[int]:
+        return itertools.count() if self.max_pages is None else iter(range(self.max_pages))
+
+    def _step(self, walk: _Walk, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Учитывает загруженную страницу в walk. :return: Новые посты страницы."""
+        walk.pages += 1
+        if "error" in result:
+            logger.error(f"Канал {self.handle}: обход прерван, позиция не сохранена")
+            walk.failed = True
+            return []
+        posts = result["posts"]
+        fresh = self._take(posts, walk.since, walk.before)
+        if fresh:
+            walk.newest = max(walk.newest, fresh[0]["id"])
+        walk.before = self._next_before(posts, walk.since, walk.before)
+        walk.done = walk.before is None
+        return fresh
+
+    def _start(self) -> Tuple[int, Optional[Tuple[int, int]]]:
+        if not self.incremental:
+            return 0, None
+        return self.store.get(self.handle), self.store.get_cursor(self.handle)
+
+    def _settle_gap(self, gap: _Walk, pending: int) -> bool:
+        """
+        Итог дочитывания пробела с прошлого обхода.
+
+        :return: True, если пробел пройден и можно брать новые посты.
+        """
+        if gap.failed:
+            return False
+        if not gap.done:
+            self.store.set_cursor(self.handle, gap.before, pending)
+            logger.info(f"Канал {self.handle}: пробел дочитан до сообщения {gap.before}, продолжение в следующий раз")
+            return False
+        self.store.set(self.handle, pending)
+        logger.info(f"Канал {self.handle}: пробел пройден, обработано до сообщения {pending}")
+        return True
+
+    def _settle(self, top: _Walk) -> None:
+        if top.failed or not top.pages:
+            return
+        if top.done or not top.since:
+            # при первом обходе глубина ограничена max_pages намеренно
+            self._finish(top.since, top.newest)
+        else:
+            # между since и top.before остался пробел: дочитаем его в следующий раз
+            self.store.set_cursor(self.handle, top.before, top.newest)
+            logger.info(f"Канал {self.handle}: достигнут max_pages, продолжение с сообщения {top.before}")
+
+    def _finish(self, since: int, newest: int) -> None:
+        if newest > since:
+            self.store.set(self.handle, newest)
+            logger.info(f"Канал {self.handle}: обработано до сообщения {newest}")
+
+    def _walk(self, walk: _Walk, pages: Iterator[int]) -> Iterator[Dict[str, Any]]:
+        for _ in pages:
+            result = TelegramHistoryPage(self.page_url(walk.before), timeout=self.timeout).parse()
+            yield from self._step(walk, result)
+            if walk.done or walk.failed:
+                return
+
+    async def _awalk(self, walk: _Walk, pages: Iterator[int]) -> AsyncIterator[Dict[str, Any]]:
+        for _ in pages:
+            result = await TelegramHistoryPage(self.page_url(walk.before), timeout=self.timeout).aparse()
+            for post in self._step(walk, result):
+                yield post
+            if walk.done or walk.failed:
+                return
+
+    def iter_posts(self) -> Iterator[Dict[str, Any]]:
+        """
+        Отдаёт посты канала, которых не было в прошлых обходах: сначала
+        непройденный пробел с прошлого раза (если он есть), затем новые, от новых к старым.
+        """
+        since, cursor = self._start()
+        pages = self._pages()
+        if cursor is not None:
+            before, pending = cursor
+            gap = _Walk(since, before)
+            yield from self._walk(gap, pages)
+            if not self._settle_gap(gap, pending):
+                return
+            since = pending
+        top = _Walk(since)
+        yield from self._walk(top, pages)
+        self._settle(top)
+
+    async def aiter_posts(self) -> AsyncIterator[Dict[str, Any]]:
+        """Асинхронный аналог iter_posts: позиции (SQLite) читаются и пишутся в отдельном потоке."""
+        since, cursor = await asyncio.to_thread(self._start)
+        pages = self._pages()
+        if cursor is not None:
+            before, pending = cursor
+            gap = _Walk(since, before)
+            async for post in self._awalk(gap, pages):
+                yield post
+            if not await asyncio.to_thread(self._settle_gap, gap, pending):
+                return
+            since = pending
+        top = _Walk(since)
+        async for post in self._awalk(top, pages):
+            yield post
+        await asyncio.to_thread(self._settle, top)
@@ -0,0 +1,177 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from .store import Shared
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+
+
+class HostThrottle:
+    """
+    Вежливая загрузка: token bucket на каждый хост и адаптивный откат.
+
+      - RATE / BURST: запросов в секунду и размер всплеска для хоста по умолчанию;
+      - HOST_RATES: отдельные (rate, burst) для хостов, которые быстро начинают
+        отвечать 429 (t.me);
+      - на 429/5xx скорость хоста делится пополам, а сам хост замораживается на
+        Retry-After или на экспоненциальную паузу с джиттером; успешные ответы
+        постепенно возвращают скорость к базовой.
+
+    Ожидание токена идёт до захвата общих лимитов параллельности, поэтому
+    притормаживаемый хост не занимает слоты остальных.
+    """
+    RATE = 5.0
+    BURST = 5.0
+    HOST_RATES = {
+        "t.me": (2.0, 4.0),
+        "telegram.me": (2.0, 4.0),
+    }
+    MIN_RATE = 0.1
+    BACKOFF_BASE = 1.0
+    MAX_BACKOFF = 120.0
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None, host_rates: Optional[Dict] = None) -> None:
+        self.rate = rate or self.RATE
+        self.burst = burst or self.BURST
+        self.host_rates = dict(self.HOST_RATES if host_rates is None else host_rates)
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.host_rates.get(host, (self.rate, self.burst))
+            bucket = self._buckets[host] = _Bucket(rate, burst)
+        return bucket
+
+    def reserve(self, host: str) -> float:
+        """
+        Пытается взять токен для хоста.
+
+        :return: 0, если токен взят; иначе сколько секунд подождать до следующей попытки.
+        """
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if now < bucket.blocked_until:
+                return bucket.blocked_until - now
+            bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / bucket.rate
+
+    def acquire(self, url: str) -> None:
+        """Блокирует поток, пока хост url не разрешит очередной запрос."""
+        host = host_of(url)
+        while True:
+            wait = self.reserve(host)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, url: str) -> None:
+        """Асинхронный аналог acquire."""
+        host = host_of(url)
+        while True:
+            wait = self.reserve(host)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def report(self, url: str, status: int, retry_after: Optional[str] = None) -> None:
+        """
+        Сообщает статус ответа хоста, чтобы подстроить его скорость.
+
+        :param url: Адрес запроса.
+        :param status: HTTP-статус.
+        :param retry_after: Значение заголовка Retry-After, если он был.
+        """
+        host = host_of(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            if status in BACKOFF_STATUSES:
+                bucket.strikes += 1
+                bucket.rate = max(self.MIN_RATE, bucket.rate / 2)
+                bucket.tokens = 0
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = min(self.MAX_BACKOFF, self.BACKOFF_BASE * 2 ** (bucket.strikes - 1))
+                    delay *= random.uniform(0.5, 1.5)
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+                logger.warning(f"{host} ответил {status}: пауза {delay:.1f}s, скорость {bucket.rate:.2f} запр/с")
+            elif status < 400:
+                bucket.strikes = 0
+                bucket.rate = min(bucket.base_rate, bucket.rate * 1.25)
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата. None, если заголовка нет или он некорректен."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def round_robin_order(urls: List[str]) -> List[int]:
+    """
+    Порядок обхода, чередующий хосты: a1, b1, c1, a2, b2, ...
+    Подряд идущие ссылки одного домена не выстраиваются в очередь перед остальными.
+
+    :return: Индексы urls в новом порядке.
+    """
+    queues: "OrderedDict[str, List[int]]" = OrderedDict()
+    for i, url in enumerate(urls):
+        queues.setdefault(host_of(url), []).append(i)
+    order: List[int] = []
+    active = deque(iter(indices) for indices in queues.values())
+    while active:
+        host_indices = active.popleft()
+        index = next(host_indices, None)
+        if index is not None:
+            order.append(index)
+            active.append(host_indices)
+    return order
+
+
+_throttle: Shared[HostThrottle] = Shared(HostThrottle)
+
+
+def get_throttle() -> HostThrottle:
+    """Возвращает общий для процесса HostThrottle."""
+    return _throttle.get()
+
+
+def configure_throttle(**kwargs) -> HostThrottle:
+    """Пересоздаёт общий HostThrottle с другими настройками."""
+    return _throttle.configure(**kwargs)
@@ -0,0 +1,350 @@
+"""
+Пакетный прогон таблицы ссылок: парсинг → LLMAsJudge → CreativeGenerator.
+
+    python -m pipeline adv_info.xlsx results.csv [--sheet База] [--column promote_url]
+                       [--parse-workers 32] [--judge-workers 4] [--generate-workers 4]
+
+Стадии работают конкурентно и связаны очередями ограниченной длины: если
+LLM не успевает, парсинг ждёт, а не копит результаты в памяти. Строки пишутся
+в выходной файл (.csv или .xlsx) по мере готовности, в порядке завершения.
+Одинаковые ссылки (после canonicalize) обрабатываются один раз; уже виденные
+адреса хранятся во временной базе SQLite на диске, а не в памяти.
+Ключ API берётся из переменной окружения MISTRAL_API_KEY.
+"""
+import os
+import csv
+import asyncio
+import logging
+import argparse
+import itertools
+import traceback
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from factory import aparse_url
+from llm_as_judge import LLMAsJudge
+from moderation import CreativeGenerator
+from parsers.aio import close_async_fetcher
+from parsers.canonical import canonicalize
+from parsers.density import compact_page
+from parsers.store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "mistral-large-latest"
+DEFAULT_COLUMN = "promote_url"
+PARSE_WORKERS = 32
+JUDGE_WORKERS = 4
+GENERATE_WORKERS = 4
+# длина очереди между стадиями в расчёте на одного воркера следующей стадии
+QUEUE_PER_WORKER = 2
+# сколько строк входного файла читается за один переход в поток
+READ_BATCH = 64
+LOG_EVERY = 100
+
+FIELDS = (
+    ["url", "canonical_url", "model", "product_name", "topics", "prompt"]
+    + [f"{name}_{i}" for i in (1, 2, 3) for name in ("style", "headline", "ad_text")]
+    + ["error"]
+)
+
+
+def iter_urls(path: str, column: str = DEFAULT_COLUMN, sheet: Optional[str] = None) -> Iterator[str]:
+    """
+    Читает ссылки из колонки column построчно, не загружая файл целиком.
+    Поддерживаются .csv и .xlsx (нужен openpyxl); пустые ячейки пропускаются.
+    """
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            rows = (workbook[sheet] if sheet else workbook.active).iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+            if column not in header:
+                raise ValueError(f"Колонка {column!r} не найдена в {path}")
+            index = header.index(column)
+            for row in rows:
+                value = row[index] if index < len(row) else None
+                if value and str(value).strip():
+                    yield str(value).strip()
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if column not in (reader.fieldnames or []):
+            raise ValueError(f"Колонка {column!r} не найдена в {path}")
+        for row in reader:
+            value = (row.get(column) or "").strip()
+            if value:
+                yield value
+
+
+class SeenUrls(SQLiteStore):
+    """
+    Множество уже поставленных в работу адресов для дедупликации за один прогон.
+    Пустой путь — приватная временная база SQLite: она живёт на диске (в памяти
+    только страничный кэш) и удаляется при закрытии соединения.
+    """
+    DEFAULT_PATH = ""
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def add(self, key: str) -> bool:
+        """:return: True, если адрес встретился впервые."""
+        with self._lock:
+            added = self._conn.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,)).rowcount == 1
+        self.count += added
+        return added
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RowWriter:
+    """
+    Построчная запись результатов в .csv или .xlsx (write-only режим openpyxl,
+    строки не держатся в памяти). Колонки — FIELDS.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.rows = 0
+        self._xlsx = path.lower().endswith(".xlsx")
+        if self._xlsx:
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+            self._illegal = ILLEGAL_CHARACTERS_RE
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet("results")
+            self._sheet.append(FIELDS)
+        else:
+            self._file = open(path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=FIELDS, extrasaction="ignore")
+            self._writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if self._xlsx:
+            self._sheet.append([self._xlsx_value(row.get(field, "")) for field in FIELDS])
+        else:
+            self._writer.writerow(row)
+            self._file.flush()
+        self.rows += 1
+
+    def _xlsx_value(self, value: Any) -> Any:
+        # управляющие символы (из текста страниц, стектрейсов) openpyxl не пишет
+        return self._illegal.sub("", value) if isinstance(value, str) else value
+
+    def close(self) -> None:
+        if self._xlsx:
+            self._workbook.save(self.path)
+        else:
+            self._file.close()
+
+
+def _creative_fields(creatives: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    for i, (style, block) in enumerate(list(creatives.items())[:3], start=1):
+        fields[f"style_{i}"] = style
+        fields[f"headline_{i}"] = block.get("headline", "")
+        fields[f"ad_text_{i}"] = block.get("ad_text", "")
+    return fields
+
+
+class Pipeline:
+    """
+    Конкурентный прогон стадий с обратным давлением.
+
+    Каждая стадия — пул воркеров, читающих свою очередь; очереди ограничены
+    (QUEUE_PER_WORKER на воркер следующей стадии), поэтому в полёте одновременно
+    не больше нескольких десятков страниц, сколько бы ссылок ни было на входе.
+    Парсинг асинхронный (aparse_url), LLMAsJudge синхронный и идёт в потоках,
+    генерация — agenerate_creatives. Все вызовы LLM проходят через общий лимитер
+    (llm_limiter) и кэш ответов (llm_cache).
+    """
+    def __init__(
+        self,
+        client: Any,
+        model: str = DEFAULT_MODEL,
+        parse_workers: int = PARSE_WORKERS,
+        judge_workers: int = JUDGE_WORKERS,
+        generate_workers: int = GENERATE_WORKERS
+    ) -> None:
+        self.client = client
+        self.model = model
+        self.parse_workers = parse_workers
+        self.judge_workers = judge_workers
+        self.generate_workers = generate_workers
+
+    @staticmethod
+    def _read_batch(urls: Iterator[str], seen: SeenUrls) -> Tuple[List[Tuple[str, str]], bool]:
+        """
+        Читает до READ_BATCH строк входа (openpyxl/csv и SQLite блокируют — вызывается в потоке).
+
+        :return: Новые пары (url, канонический адрес) и признак конца входа.
+        """
+        batch = list(itertools.islice(urls, READ_BATCH))
+        fresh = []
+        for url in batch:
+            key = canonicalize(url)
+            if seen.add(key):
+                fresh.append((url, key))
+        return fresh, len(batch) < READ_BATCH
+
+    async def _produce(self, urls: Iterator[str], out: asyncio.Queue) -> None:
+        seen = SeenUrls()
+        try:
+            finished = False
+            while not finished:
+                fresh, finished = await asyncio.to_thread(self._read_batch, urls, seen)
+                for item in fresh:
+                    await out.put(item)
+            logger.info(f"Уникальных ссылок: {seen.count}")
+        finally:
+            seen.close()
+
+    async def _parse(self, inbox: asyncio.Queue, judge: asyncio.Queue, done: asyncio.Queue) -> None:
+        while True:
+            item = await inbox.get()
+            if item is None:
+                return
+            url, canonical = item
+            data = await aparse_url(url)
+            row = {"url": url, "canonical_url": canonical, "model": self.model}
+            if not any(key != "url" for key in compact_page(data)):
+                # страница не загрузилась или пуста: в LLM отправлять нечего
+                await done.put(dict(row, error=data.get("error") or "Пустая страница"))
+            else:
+                await judge.put((row, data))
+
+    async def _judge(self, inbox: asyncio.Queue, generate: asyncio.Queue, done: asyncio.Queue) -> None:
+        while True:
+            item = await inbox.get()
+            if item is None:
+                return
+            row, data = item
+            try:
+                judge = LLMAsJudge(client=self.client, model=self.model, url=row["url"])
+                aspects = await asyncio.to_thread(judge.extract_key_aspects, data)
+            except Exception:
+                await done.put(dict(row, error=traceback.format_exc()))
+                continue
+            if not aspects:
+                await done.put(dict(row, error="LLMAsJudge не вернул ключевые аспекты"))
+                continue
+            row.update(
+                product_name=aspects.get("brand_name", ""),
+                topics="; ".join(aspects.get("themes", [])),
+                prompt=aspects.get("prompt", ""),
+            )
+            await generate.put((row, aspects))
+
+    async def _generate(self, inbox: asyncio.Queue, done: asyncio.Queue) -> None:
+        while True:
+            item = await inbox.get()
+            if item is None:
+                return
+            row, aspects = item
+            try:
+                generator = CreativeGenerator(client=self.client, model=self.model, url=row["url"])
+                creatives = await generator.agenerate_creatives(aspects.get("prompt", ""), aspects)
+                row.update(_creative_fields(creatives), error=None)
+            except Exception:
+                row["error"] = traceback.format_exc()
+            await done.put(row)
+
+    async def _write(self, inbox: asyncio.Queue, writer: RowWriter) -> None:
+        while True:
+            row = await inbox.get()
+            if row is None:
+                return
+            try:
+                writer.write(row)
+            except Exception:
+                # строка теряется, но прогон продолжается
+                logger.exception(f"Не удалось записать строку для {row.get('url')}")
+                continue
+            if writer.rows % LOG_EVERY == 0:
+                logger.info(f"Записано строк: {writer.rows}")
+
+    @staticmethod
+    async def _stop(workers: List["asyncio.Task"], inbox: asyncio.Queue) -> None:
+        for _ in workers:
+            await inbox.put(None)
+        await asyncio.gather(*workers)
+
+    async def _drive(
+        self,
+        urls: Iterator[str],
+        stages: List[Tuple[List["asyncio.Task"], asyncio.Queue]]
+    ) -> None:
+        await self._produce(urls, stages[0][1])
+        # стадии останавливаются по очереди: следующая — когда предыдущая выдала всё
+        for workers, inbox in stages:
+            await self._stop(workers, inbox)
+
+    async def run(self, urls: Iterator[str], writer: RowWriter) -> int:
+        """
+        Прогоняет ссылки через все стадии и пишет строки в writer.
+        Если любая стадия падает, остальные отменяются, а исключение
+        поднимается из run (в ExceptionGroup), а не оставляет очереди висеть.
+
+        :return: Число записанных строк.
+        """
+        parse_q: asyncio.Queue = asyncio.Queue(self.parse_workers * QUEUE_PER_WORKER)
+        judge_q: asyncio.Queue = asyncio.Queue(self.judge_workers * QUEUE_PER_WORKER)
+        generate_q: asyncio.Queue = asyncio.Queue(self.generate_workers * QUEUE_PER_WORKER)
+        done_q: asyncio.Queue = asyncio.Queue(self.generate_workers * QUEUE_PER_WORKER)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                parsers = [group.create_task(self._parse(parse_q, judge_q, done_q)) for _ in range(self.parse_workers)]
+                judges = [group.create_task(self._judge(judge_q, generate_q, done_q)) for _ in range(self.judge_workers)]
+                generators = [group.create_task(self._generate(generate_q, done_q)) for _ in range(self.generate_workers)]
+                write_task = group.create_task(self._write(done_q, writer))
+                group.create_task(self._drive(urls, [
+                    (parsers, parse_q), (judges, judge_q), (generators, generate_q), ([write_task], done_q)
+                ]))
+        finally:
+            await close_async_fetcher()
+        return writer.rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("input", help="Таблица со ссылками (.csv или .xlsx)")
+    ap.add_argument("output", help="Файл результатов (.csv или .xlsx)")
+    ap.add_argument("--column", default=DEFAULT_COLUMN)
+    ap.add_argument("--sheet", default=None, help="Лист .xlsx; по умолчанию активный")
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    ap.add_argument("--judge-workers", type=int, default=JUDGE_WORKERS)
+    ap.add_argument("--generate-workers", type=int, default=GENERATE_WORKERS)
+    args = ap.parse_args()
+
+    from mistralai import Mistral
+
+    logging.basicConfig(level=logging.INFO)
+    client = Mistral(api_key=os.environ["MISTRAL_API_KEY"])
+    pipeline = Pipeline(
+        client,
+        model=args.model,
+        parse_workers=args.parse_workers,
+        judge_workers=args.judge_workers,
+        generate_workers=args.generate_workers
+    )
+    writer = RowWriter(args.output)
+    try:
+        rows = asyncio.run(pipeline.run(iter_urls(args.input, args.column, args.sheet), writer))
+    finally:
+        writer.close()
+    logger.info(f"Готово: {rows} строк в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import re
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from parsers.store import Shared
+
+logger = logging.getLogger(__name__)
+
+# Поля результата парсера в порядке важности для LLM: при нехватке бюджета
+# обрезаются и выпадают последние. Остальные поля идут после перечисленных.
+FIELD_PRIORITY = (
+    "url",
+    "title",
+    "meta_description",
+    "description",
+    "meta_keywords",
+    "headings",
+    "main_text",
+    "paragraphs",
+    "last_posts",
+    "full_text",
+)
+
+# Оценка числа токенов без токенизатора: линейная модель по «кускам» текста,
+# откалибрована по tekken-токенизатору Mistral на parsed_results.csv
+# (медианная ошибка ~2% на текстах от 300 токенов). Запас ESTIMATE_MARGIN
+# держит оценку сверху, чтобы бюджет не превышался.
+_PIECE_RE = re.compile(r"[А-Яа-яЁё]+|[A-Za-z]+|\d|\s+|[^\w\s]|\w")
+_COST_CYR_WORD, _COST_CYR_CHAR = 0.38, 0.19
+_COST_LAT_WORD, _COST_LAT_CHAR = 1.26, 0.04
+_COST_DIGIT = 1.31
+_COST_SPACE = 0.29
+_COST_OTHER_BYTE = 0.82
+ESTIMATE_MARGIN = 1.1
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценивает число токенов текста (см. калибровку выше)."""
+    cost = 0.0
+    for match in _PIECE_RE.finditer(text):
+        piece = match.group()
+        ch = piece[0]
+        if "А" <= ch <= "я" or ch in "Ёё":
+            cost += _COST_CYR_WORD + _COST_CYR_CHAR * len(piece)
+        elif ch.isascii() and ch.isalpha():
+            cost += _COST_LAT_WORD + _COST_LAT_CHAR * len(piece)
+        elif ch.isdigit():
+            cost += _COST_DIGIT
+        elif ch.isspace():
+            cost += _COST_SPACE
+        else:
+            cost += _COST_OTHER_BYTE * len(piece.encode("utf-8"))
+    return int(cost * ESTIMATE_MARGIN) + 1
+
+
+class TokenCounter:
+    """
+    Считает токены локально: токенизатором mistral_common (tekken), если пакет
+    установлен, иначе — откалиброванной оценкой estimate_tokens.
+    """
+    def __init__(self) -> None:
+        self._encode: Optional[Callable[[str], List[int]]] = None
+        try:
+            from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+            tokenizer = MistralTokenizer.v3(is_tekken=True).instruct_tokenizer.tokenizer
+            self._encode = lambda text: tokenizer.encode(text, bos=False, eos=False)
+        except Exception as e:
+            logger.info(f"Токенизатор mistral_common недоступен ({e}), используется оценка")
+
+    @property
+    def exact(self) -> bool:
+        return self._encode is not None
+
+    def count(self, text: str) -> int:
+        if self._encode is not None:
+            return len(self._encode(text))
+        return estimate_tokens(text)
+
+    def count_messages(self, messages: Sequence[Dict[str, str]]) -> int:
+        """Токены списка сообщений чата, с небольшой надбавкой на служебную разметку ролей."""
+        return sum(self.count(m["content"]) + 4 for m in messages)
+
+
+_counter: Shared[TokenCounter] = Shared(TokenCounter)
+
+
+def get_token_counter() -> TokenCounter:
+    """Возвращает общий для процесса TokenCounter (токенизатор загружается один раз)."""
+    return _counter.get()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class PromptPacker:
+    """
+    Упаковывает словарь страницы в JSON не длиннее бюджета токенов.
+
+    Поля добавляются по FIELD_PRIORITY. Поле, которое целиком не помещается,
+    урезается: строка — по границе слова, список — по элементам (последний
+    поместившийся элемент тоже может быть урезан), словарь — по ключам.
+    После этого упаковка останавливается. Результат — всегда корректный JSON.
+
+    :param budget: Бюджет токенов на JSON.
+    :param counter: Счётчик токенов (по умолчанию общий TokenCounter).
+    """
+    MIN_TEXT_TOKENS = 16
+    # больше символов на токен не бывает: длиннее room * MAX_CHARS_PER_TOKEN
+    # текст заведомо не поместится, и его не нужно токенизировать целиком
+    MAX_CHARS_PER_TOKEN = 8
+    REPACK_ATTEMPTS = 3
+
+    def __init__(self, budget: int, counter: Optional[TokenCounter] = None) -> None:
+        self.budget = budget
+        self.counter = counter or get_token_counter()
+
+    def cost(self, value: Any) -> int:
+        """Токены значения в сериализованном виде."""
+        return self.counter.count(_dumps(value))
+
+    def pack(self, data: Dict[str, Any]) -> str:
+        ordered = sorted(
+            data.items(),
+            key=lambda kv: FIELD_PRIORITY.index(kv[0]) if kv[0] in FIELD_PRIORITY else len(FIELD_PRIORITY)
+        )
+        # части считаются по отдельности, а токены на стыках не строго аддитивны:
+        # если итог вышел за бюджет, упаковываем заново с поправкой
+        room = self.budget
+        for _ in range(self.REPACK_ATTEMPTS):
+            packed, _, _ = self._fit_dict(ordered, room)
+            result = _dumps(packed or {})
+            overflow = self.counter.count(result) - self.budget
+            if overflow <= 0:
+                return result
+            room -= overflow + 1
+        return result
+
+    def _fit(self, value: Any, room: int) -> Tuple[Any, bool, int]:
+        """:return: (урезанное значение или None, поместилось ли целиком, его стоимость)."""
+        if room <= 0:
+            return None, False, 0
+        dumped = _dumps(value)
+        if len(dumped) <= room * self.MAX_CHARS_PER_TOKEN:
+            cost = self.counter.count(dumped)
+            if cost <= room:
+                return value, True, cost
+        if isinstance(value, str):
+            fitted = self._fit_text(value, room)
+            return fitted, False, self.cost(fitted) if fitted else 0
+        if isinstance(value, list):
+            return self._fit_list(value, room)
+        if isinstance(value, dict):
+            return self._fit_dict(list(value.items()), room)
+        return None, False, 0
+
+    def _fit_dict(self, items: List[Tuple[str, Any]], room: int) -> Tuple[Optional[Dict[str, Any]], bool, int]:
+        packed: Dict[str, Any] = {}
+        used = 2
+        for key, value in items:
+            # ключ, двоеточие и запятая
+            key_cost = self.counter.count(_dumps(key)) + 2
+            fitted, whole, cost = self._fit(value, room - used - key_cost)
+            if fitted not in (None, "", [], {}):
+                packed[key] = fitted
+                used += key_cost + cost
+            if not whole:
+                return packed or None, False, used
+        return packed, True, used
+
+    def _fit_list(self, items: List[Any], room: int) -> Tuple[Optional[List[Any]], bool, int]:
+        packed: List[Any] = []
+        used = 2
+        for item in items:
+            fitted, whole, cost = self._fit(item, room - used - 1)
+            if fitted not in (None, "", [], {}):
+                packed.append(fitted)
+                used += cost + 1
+            if not whole:
+                return packed or None, False, used
+        return packed, True, used
+
+    def _fit_text(self, text: str, room: int) -> Optional[str]:
+        if room < self.MIN_TEXT_TOKENS:
+            return None
+        # бинарный поиск по длине: O(log n) вызовов счётчика
+        lo, hi = 0, min(len(text), room * self.MAX_CHARS_PER_TOKEN)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.cost(text[:mid]) <= room:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = text[:lo]
+        space = cut.rfind(" ")
+        if lo < len(text) and space > len(cut) // 2:
+            cut = cut[:space]
+        return cut.rstrip() or None
+
+
+def pack_page(data: Dict[str, Any], budget: int, counter: Optional[TokenCounter] = None) -> str:
+    """Упаковывает данные страницы в JSON в пределах budget токенов (см. PromptPacker)."""
+    return PromptPacker(budget, counter).pack(data)
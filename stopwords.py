@@ -0,0 +1,58 @@
+import os
+import re
+from typing import Iterable, List, Optional, Pattern, Set
+
+from parsers.store import Shared
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensetive_words.txt")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def load_stopwords(path: str = DEFAULT_PATH) -> Set[str]:
+    """Стоп-слова из файла, разделённые запятыми."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    return {w.strip().lower() for w in content.split(",") if w.strip()}
+
+
+def compile_stopword_pattern(stopwords: Iterable[str]) -> Pattern:
+    escaped = map(re.escape, sorted(stopwords, key=len, reverse=True))
+    return re.compile(r"\b(" + "|".join(escaped) + r")\b", re.IGNORECASE)
+
+
+class StopwordMatcher:
+    """
+    Поиск стоп-слов в тексте. Почти весь словарь — отдельные слова: текст
+    разбивается на слова, и каждое проверяется по множеству. Регуляркой
+    ищутся только составные записи (через дефис, пробел, знаки) — их единицы.
+    """
+    def __init__(self, stopwords: Iterable[str]) -> None:
+        words, phrases = set(), []
+        for stopword in stopwords:
+            if _WORD_RE.fullmatch(stopword):
+                words.add(stopword)
+            else:
+                phrases.append(stopword)
+        self.words = frozenset(words)
+        self.pattern: Optional[Pattern] = compile_stopword_pattern(phrases) if phrases else None
+
+    def find(self, text: str) -> List[str]:
+        """:return: Найденные в тексте стоп-слова (без повторов, по алфавиту)."""
+        found = {word for word in _WORD_RE.findall(text.lower()) if word in self.words}
+        if self.pattern is not None:
+            found.update(match.group(0).lower() for match in self.pattern.finditer(text))
+        return sorted(found)
+
+
+_matcher: Shared[StopwordMatcher] = Shared(lambda: StopwordMatcher(load_stopwords()))
+
+
+def get_stopword_matcher() -> StopwordMatcher:
+    """Возвращает общий для процесса StopwordMatcher, читая файл при первом обращении."""
+    return _matcher.get()
+
+
+def find_stopwords(text: str, matcher: Optional[StopwordMatcher] = None) -> List[str]:
+    """:return: Найденные в тексте стоп-слова (без повторов, по алфавиту)."""
+    return (matcher or get_stopword_matcher()).find(text)
@@ -0,0 +1,100 @@
+"""
+Соответствие HTML-бэкендов (parsers.backends): каждый парсер на корпусе
+страниц из tests/fixtures должен давать одинаковый результат на html.parser,
+lxml и selectolax.
+
+Допустимое расхождение одно: на невалидной разметке main_text. Он строится
+по блокам (parsers.density), а html.parser не выносит текст из неявно
+закрытого <p> в родительский блок, как это делают HTML5-парсеры.
+
+От прежнего разбора html.parser (soup.title.get_text(strip=True), find_all,
+get_text) результат на невалидной разметке отличается намеренно:
+  - title — текст без тегов с исходными пробелами ("Распродажа до -50% & доставка",
+    а не "Распродажадо -50%& доставка"), в full_text — одной строкой;
+  - неявно закрытые <p> и <h1> не включают текст следующих абзацев и <h2>.
+На валидной разметке результат прежний.
+"""
+import os
+import importlib.util
+
+import pytest
+
+from parsers.backends import BACKENDS, SoupBackend
+from parsers.base import LandingPageParser
+from parsers.tg_bot import TelegramBotWebParser
+from parsers.tg_channel import TelegramPostParser, TelegramWebParser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# поля, которые могут отличаться между бэкендами на данной странице
+CASES = [
+    (LandingPageParser, "landing.html", ()),
+    (LandingPageParser, "malformed.html", ("main_text",)),
+    (TelegramWebParser, "tg_channel.html", ()),
+    (TelegramBotWebParser, "tg_bot.html", ()),
+    (TelegramPostParser, "tg_post.html", ()),
+]
+
+_MODULES = {"lxml": "lxml", "selectolax": "selectolax"}
+
+
+def _load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _parse(parser_cls, fixture, backend_name):
+    module = _MODULES.get(backend_name)
+    if module and importlib.util.find_spec(module) is None:
+        pytest.skip(f"{module} не установлен")
+    html = _load(fixture)
+    parser = parser_cls(f"https://example.com/{fixture}", html=html)
+    parser.backend = BACKENDS[backend_name]()
+    return parser.parse_html(html)
+
+
+@pytest.mark.parametrize("backend_name", [name for name in BACKENDS if name != SoupBackend.name])
+@pytest.mark.parametrize("parser_cls, fixture, may_differ", CASES, ids=[case[1] for case in CASES])
+def test_backend_matches_html_parser(parser_cls, fixture, may_differ, backend_name):
+    expected = _parse(parser_cls, fixture, SoupBackend.name)
+    actual = _parse(parser_cls, fixture, backend_name)
+    assert expected.keys() == actual.keys()
+    for key in expected:
+        if key not in may_differ:
+            assert actual[key] == expected[key], key
+
+
+@pytest.mark.parametrize("backend_name", list(BACKENDS))
+def test_malformed_markup_follows_html5(backend_name):
+    result = _parse(LandingPageParser, "malformed.html", backend_name)
+    assert result["title"] == "Распродажа до -50% & доставка"
+    assert "<b>" not in result["full_text"]
+    assert result["full_text"].startswith(LandingPageParser.preprocess_text("Распродажа до -50% & доставка") + ".")
+    assert result["headings"] == ["Заголовок", "Подзаголовок"]
+    assert result["paragraphs"] == [
+        "Первый абзац без закрывающего тега",
+        "Второй абзац",
+        "Абзац перед списком",
+        "Последний абзац с курсивом",
+    ]
+
+
+@pytest.mark.parametrize("backend_name", list(BACKENDS))
+def test_telegram_fixtures(backend_name):
+    channel = _parse(TelegramWebParser, "tg_channel.html", backend_name)
+    assert channel["description"] == "Спешелти-кофе и выпечка. Москва, ул. Примерная, 1"
+    assert [post["text"] for post in channel["last_posts"]] == [
+        "Новый сорт из Эфиопии уже в зале!\nПопробуйте\nфильтр\nсо скидкой.",
+        "Работаем в выходные с 9 до 22.",
+        "",
+    ]
+
+    bot = _parse(TelegramBotWebParser, "tg_bot.html", backend_name)
+    assert bot == {
+        "title": "Заказ кофе",
+        "description": "Закажите кофе заранее и заберите без очереди .",
+    }
+
+    post = _parse(TelegramPostParser, "tg_post.html", backend_name)
+    assert post["description"] == "Новый сорт из Эфиопии уже в зале! Попробуйте фильтр со скидкой."
+    assert post["url"] == "tg://resolve?domain=zerno_coffee&post=101"
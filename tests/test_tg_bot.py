@@ -0,0 +1,31 @@
+import pytest
+
+from parsers.backends import BACKENDS
+from parsers.tg_bot import TelegramBotWebParser
+
+DESCRIPTION_FIRST = """
+<html><body>
+<div class="tgme_page_description" dir="auto">Описание идёт первым</div>
+<div class="tgme_page_title" dir="auto"><span dir="auto">Бот</span></div>
+<div class="tgme_page_extra">@bot</div>
+</body></html>
+"""
+
+
+def test_trim_ignores_marker_outside_class_attribute():
+    html = (
+        '<head><link href="tgme_page_description.css"></head>'
+        '<div class="tgme_page_title"><span>Бот</span></div>'
+        '<div class="tgme_page_extra">x</div>'
+        '<div class="tgme_page_description">Описание</div><div>хвост</div>'
+    )
+    trimmed = TelegramBotWebParser("https://t.me/bot").trim_html(html)
+    assert trimmed.endswith('<div class="tgme_page_description">Описание</div>')
+
+
+@pytest.mark.parametrize("backend_name", list(BACKENDS))
+def test_description_before_title_is_not_cut(backend_name):
+    pytest.importorskip(backend_name if backend_name != "html.parser" else "bs4")
+    parser = TelegramBotWebParser("https://t.me/bot", html=DESCRIPTION_FIRST)
+    parser.backend = BACKENDS[backend_name]()
+    assert parser.parse_html(DESCRIPTION_FIRST) == {"title": "Бот", "description": "Описание идёт первым"}